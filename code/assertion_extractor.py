@@ -1,13 +1,29 @@
 #!/usr/bin/env python3
 import os
+import re
 import sys
 import ast
 import csv
-import git
-import tempfile
+import json
+import codecs
 import logging
+import time
+import argparse
+import contextlib
+import itertools
+from collections import deque
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Set, Optional, Tuple
+from typing import List, Dict, Set, Optional, Tuple, Callable, Iterable, Iterator, Sequence, Union, NamedTuple
+from result_cache import ResultCache, git_blob_sha, DEFAULT_CACHE_MAX_BYTES
+from discovery import iter_test_files
+from clone_manager import CloneManager, CloneError
+from git_source import BlobSource, resolve_repo, list_tree_files, iter_blob_sources, commit_time
+from guarded_pool import GuardedPool, TaskTimeout, WorkerCrashed
+from profiling import Profiler, peak_rss_bytes
+from records import AssertionTable, CacheRow, SkippedFile, ROW_KEYS, UNKNOWN_METHOD
+from result_store import ResultStore
 
 # Configure logging
 logging.basicConfig(
@@ -16,168 +32,611 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class AssertionVisitor(ast.NodeVisitor):
-    """AST visitor that finds all assertion statements in Python code."""
+# bump whenever a change to the extraction logic alters the rows produced,
+# so that cached results from older versions are not reused
+EXTRACTOR_VERSION = "7"
+
+# number of files handed to a worker process per task
+DEFAULT_CHUNK_SIZE = 16
+
+# files larger than this are skipped by the command line tools unless told otherwise
+DEFAULT_MAX_FILE_MB = 10
+
+OUTPUT_FORMATS = ('csv', 'jsonl')
+CSV_HEADER = ['filepath', 'testclass', 'testname', 'line number', 'assert string']
+SKIPPED_FIELDS = ('filepath', 'reason', 'detail')
+
+_LINE_END = re.compile(rb'\r\n|\r|\n')
+
+class SourceBuffer:
+    """Slices the exact source text of AST nodes out of a single UTF-8 buffer.
+
+    AST column offsets are UTF-8 byte offsets, so the buffer must hold the file
+    content encoded as UTF-8. Line start offsets are only computed on first use.
+    """
     
-    def __init__(self, filepath: str):
-        self.filepath = filepath
-        self.assertions = []
-        self.current_class = None
-        self.current_function = None
-        self.line_mapping = {}
+    def __init__(self, data: bytes):
+        self.data = data
+        self._line_starts = None
         
-    def visit_ClassDef(self, node):
-        old_class = self.current_class
-        self.current_class = node.name
-        self.generic_visit(node)
-        self.current_class = old_class
+    def _starts(self) -> List[int]:
+        if self._line_starts is None:
+            # the tokenizer ends lines at \r\n, \r or \n (like ast._splitlines_no_ff),
+            # so old Mac line endings must count too
+            self._line_starts = [0] + [match.end() for match in _LINE_END.finditer(self.data)]
+        return self._line_starts
         
-    def visit_FunctionDef(self, node):
-        old_function = self.current_function
-        self.current_function = node.name
-        self.generic_visit(node)
-        self.current_function = old_function
+    def segment(self, node: ast.AST) -> Optional[str]:
+        """Return the source text spanned by node, or None if it has no end position."""
+        end_lineno = getattr(node, 'end_lineno', None)
+        end_col_offset = getattr(node, 'end_col_offset', None)
+        if end_lineno is None or end_col_offset is None:
+            return None
+        starts = self._starts()
+        try:
+            start = starts[node.lineno - 1] + node.col_offset
+            end = starts[end_lineno - 1] + end_col_offset
+        except IndexError:
+            return None
+        return self.data[start:end].decode('utf-8', 'replace')
+
+# only statement bodies can define functions or classes, so outside a test
+# function these are the only fields worth descending into
+_BODY_FIELDS = frozenset({'body', 'orelse', 'finalbody', 'handlers', 'cases'})
+
+def is_test_name(name: str) -> bool:
+    """Whether a function name marks a test (covers test_*, Test* and *test*)."""
+    return 'test' in name.lower()
+
+# category of an assert statement comparing with a single operator (the first one for chains)
+_COMPARE_CATEGORIES = {
+    ast.Eq: 'Equality', ast.NotEq: 'Inequality',
+    ast.In: 'Membership', ast.NotIn: 'Membership',
+    ast.Is: 'Identity', ast.IsNot: 'Identity Not',
+    ast.Gt: 'Greater Than', ast.GtE: 'Greater Than',
+    ast.Lt: 'Less Than', ast.LtE: 'Less Than',
+}
+
+def _method_category(name: str) -> str:
+    if name.startswith('assert_') and ('call' in name or 'await' in name):
+        return 'Mock Call'
+    suffix = name[len('assert'):].lstrip('_').lower()
+    if 'raises' in suffix or 'warns' in suffix:
+        return 'Exception'
+    if suffix.startswith('greater'):
+        return 'Greater Than'
+    if suffix.startswith('less'):
+        return 'Less Than'
+    if 'isinstance' in suffix or 'subclass' in suffix:
+        return 'Type'
+    if suffix in ('isnot', 'isnotnone'):
+        return 'Identity Not'
+    if suffix in ('is', 'isnone'):
+        return 'Identity'
+    if suffix in ('in', 'notin'):
+        return 'Membership'
+    if 'equal' in suffix:
+        return 'Inequality' if suffix.startswith('not') else 'Equality'
+    if suffix == 'true':
+        return 'Boolean True'
+    if suffix == 'false':
+        return 'Boolean False'
+    return 'Other'
+
+def categorize_assertion(node: ast.AST) -> str:
+    """Classify an assertion node by its comparison operator or assertion method name."""
+    if isinstance(node, ast.Assert):
+        test = node.test
+        if isinstance(test, ast.Compare):
+            return _COMPARE_CATEGORIES.get(type(test.ops[0]), 'Other')
+        if isinstance(test, ast.UnaryOp) and isinstance(test.op, ast.Not):
+            return 'Boolean False'
+        if isinstance(test, ast.Call) and isinstance(test.func, ast.Name) and test.func.id == 'isinstance':
+            return 'Type'
+        return 'Boolean True'
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        if node.func.attr == 'raises':
+            return 'Exception'
+        return _method_category(node.func.attr)
+    return 'Other'
+
+def assertion_method(node: ast.AST) -> str:
+    """Name of the assertion form: "assert" for statements, "pytest.raises", or the called method."""
+    if isinstance(node, ast.Assert):
+        return 'assert'
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        if node.func.attr == 'raises':
+            return 'pytest.raises'
+        return node.func.attr
+    return UNKNOWN_METHOD
+
+class AssertionVisitor:
+    """Finds all assertion statements and calls inside test functions.
+
+    The tree is walked iteratively with an explicit stack, in the same order
+    ast.NodeVisitor would visit it. Test-ness is decided once per function
+    (sync or async), except that an async helper defined inside a test (the
+    usual `async def main()` pattern) stays part of the enclosing test. Outside
+    test functions only statement bodies are descended into, since
+    expressions, lambdas and non-test function signatures can never contain a
+    test function.
+    """
+    
+    def __init__(self, filepath: str, source: Optional[SourceBuffer] = None,
+                 table: Optional[AssertionTable] = None):
+        self.filepath = filepath
+        self.source = source
+        self.assertions = table if table is not None else AssertionTable()
         
-    def visit_Assert(self, node):
-        line_num = node.lineno
-        if line_num in self.line_mapping:
-            assert_string = self.line_mapping[line_num]
-        else:
-            assert_string = f"Assert at line {line_num}"
-            
-        if self.current_function and (self.current_function.startswith('test_') or 
-                                       self.current_function.startswith('Test') or 
-                                       'test' in self.current_function.lower()):
-            self.assertions.append({
-                'filepath': self.filepath,
-                'testclass': self.current_class or '',
-                'testname': self.current_function,
-                'line_number': line_num,
-                'assert_string': assert_string.strip()
-            })
-        self.generic_visit(node)
+    def _source_text(self, node, placeholder: str) -> str:
+        if self.source is not None:
+            text = self.source.segment(node)
+            if text is not None:
+                return text
+        return placeholder
         
-    def visit_Call(self, node):
-        # Check if the function call is pytest.raises
-        if isinstance(node.func, ast.Attribute) and node.func.attr == 'raises':
-            if isinstance(node.func.value, ast.Name) and node.func.value.id == 'pytest':
-                line_num = node.lineno
-                assert_string = f"pytest.raises at line {line_num}"
-                
-                if self.current_function and (self.current_function.startswith('test_') or 
-                                            self.current_function.startswith('Test') or 
-                                            'test' in self.current_function.lower()):
-                    self.assertions.append({
-                        'filepath': self.filepath,
-                        'testclass': self.current_class or '',
-                        'testname': self.current_function,
-                        'line_number': line_num,
-                        'assert_string': assert_string.strip()
-                    })
+    def _record(self, node, testclass: Optional[str], testname: str, placeholder: str):
+        self.assertions.append(self.filepath, testclass or '', testname, node.lineno,
+                               self._source_text(node, placeholder).strip(), categorize_assertion(node),
+                               assertion_method(node))
         
-        # Handle other assertion methods (e.g., self.assertEqual, assertTrue)
-        elif isinstance(node.func, ast.Attribute) and node.func.attr.startswith(('assert', 'Assert')):
-            line_num = node.lineno
-            assert_string = f"Assertion method at line {line_num}"
+    def visit(self, tree: ast.AST):
+        AST, Assert, Call, Attribute, Name, ClassDef = ast.AST, ast.Assert, ast.Call, ast.Attribute, ast.Name, ast.ClassDef
+        FunctionDef, AsyncFunctionDef = ast.FunctionDef, ast.AsyncFunctionDef
+        # entries are (node, enclosing class, enclosing function, inside a test function)
+        stack = [(tree, None, None, False)]
+        pop, push = stack.pop, stack.append
+        while stack:
+            node, testclass, testname, in_test = pop()
+            if isinstance(node, FunctionDef) or (isinstance(node, AsyncFunctionDef) and not in_test):
+                testname = node.name
+                in_test = is_test_name(testname)
+            elif isinstance(node, ClassDef):
+                testclass = node.name
+            elif in_test:
+                if isinstance(node, Assert):
+                    self._record(node, testclass, testname, f"Assert at line {node.lineno}")
+                elif isinstance(node, Call):
+                    func = node.func
+                    if isinstance(func, Attribute):
+                        if func.attr == 'raises':
+                            value = func.value
+                            if isinstance(value, Name) and value.id == 'pytest':
+                                self._record(node, testclass, testname, f"pytest.raises at line {node.lineno}")
+                        elif func.attr.startswith(('assert', 'Assert')):
+                            self._record(node, testclass, testname, f"Assertion method at line {node.lineno}")
             
-            if self.current_function and (self.current_function.startswith('test_') or 
-                                        self.current_function.startswith('Test') or 
-                                        'test' in self.current_function.lower()):
-                self.assertions.append({
-                    'filepath': self.filepath,
-                    'testclass': self.current_class or '',
-                    'testname': self.current_function,
-                    'line_number': line_num,
-                    'assert_string': assert_string.strip()
-                })
-        
-        # Recursively visit child nodes
-        self.generic_visit(node)
+            children = []
+            for field in node._fields:
+                if not in_test and field not in _BODY_FIELDS:
+                    continue
+                value = getattr(node, field, None)
+                if isinstance(value, list):
+                    for item in value:
+                        if isinstance(item, AST):
+                            children.append((item, testclass, testname, in_test))
+                elif isinstance(value, AST):
+                    children.append((value, testclass, testname, in_test))
+            # pushed in reverse so they are popped in field order
+            for child in reversed(children):
+                push(child)
+        return self.assertions
         
 
-def build_line_mapping(file_path: str) -> Dict[int, str]:
-    """Build a mapping from line numbers to line content."""
+def parse_source(raw_content: bytes) -> Tuple[ast.AST, SourceBuffer]:
+    """Parse raw file content once, returning the tree and a buffer matching its offsets."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return {i+1: line for i, line in enumerate(f.readlines())}
+        file_content = raw_content.decode('utf-8-sig')
     except UnicodeDecodeError:
-        try:
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return {i+1: line for i, line in enumerate(f.readlines())}
-        except Exception as e:
-            logger.warning(f"Could not read file {file_path}: {str(e)}")
-            return {}
-    except Exception as e:
-        logger.warning(f"Could not read file {file_path}: {str(e)}")
-        return {}
+        file_content = raw_content.decode('latin-1')
+        return ast.parse(file_content), SourceBuffer(file_content.encode('utf-8'))
+    # the raw bytes already are the UTF-8 text, minus any byte order mark
+    if raw_content.startswith(codecs.BOM_UTF8):
+        raw_content = raw_content[len(codecs.BOM_UTF8):]
+    return ast.parse(file_content), SourceBuffer(raw_content)
 
-def get_test_files(directory: str) -> List[str]:
+def get_test_files(directory: str, include: Optional[Sequence[str]] = None,
+                   exclude: Optional[Sequence[str]] = None, use_git: bool = True) -> List[str]:
     """Find all Python test files in a directory."""
-    test_files = []
-    
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.py') and ('test' in file.lower() or 'test' in root.lower()):
-                file_path = os.path.join(root, file)
-                test_files.append(file_path)
-    
-    return test_files
+    return list(iter_test_files(directory, include, exclude, use_git))
 
-def analyze_file(file_path: str) -> List[Dict]:
-    """Analyze a Python file for assertions."""
+def _skipped(file_path: str, reason: str, detail: str) -> AssertionTable:
+    table = AssertionTable()
+    table.skip(file_path, reason, detail)
+    return table
+
+def analyze_file(file_path: str, cache: Optional[ResultCache] = None,
+                 blob_sha: Optional[str] = None, timings: Optional[Dict] = None,
+                 max_bytes: Optional[int] = None) -> AssertionTable:
+    """Analyze a Python file for assertions.
+
+    When a cache is given it is consulted before parsing, keyed by the git blob
+    SHA of the file content (blob_sha may be supplied if it is already known).
+    If a timings dict is passed it is filled with the seconds spent reading,
+    parsing and visiting the file. Files over max_bytes are not read at all.
+    Files that cannot be analyzed come back as an empty table listing them in
+    skipped.
+    """
+    if cache is not None and blob_sha is not None:
+        cached = cache.get(blob_sha)
+        if cached is not None:
+            if timings is not None:
+                timings['cached'] = True
+            return _rows_from_cache(file_path, cached)
+        # already counted as a miss; don't look it up again after reading
+        cache = _StoreOnly(cache)
+    
+    start = time.perf_counter()
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            file_content = file.read()
-    except UnicodeDecodeError:
-        try:
-            with open(file_path, 'r', encoding='latin-1') as file:
-                file_content = file.read()
-        except Exception as e:
-            logger.warning(f"Could not read file {file_path}: {str(e)}")
-            return []
+        if max_bytes is not None:
+            size = os.path.getsize(file_path)
+            if size > max_bytes:
+                logger.warning(f"Skipping {file_path}: {size} bytes is over the {max_bytes} byte limit")
+                return _skipped(file_path, 'too_large', f"{size} bytes")
+        with open(file_path, 'rb') as file:
+            raw_content = file.read()
     except Exception as e:
         logger.warning(f"Could not read file {file_path}: {str(e)}")
-        return []
-        
+        return _skipped(file_path, 'unreadable', str(e))
+    if timings is not None:
+        timings['read'] = time.perf_counter() - start
+    
+    return analyze_source(file_path, raw_content, cache, blob_sha, timings, max_bytes)
+
+def analyze_source(file_path: str, raw_content: bytes, cache: Optional[ResultCache] = None,
+                   blob_sha: Optional[str] = None, timings: Optional[Dict] = None,
+                   max_bytes: Optional[int] = None) -> AssertionTable:
+    """Analyze in-memory Python source for assertions, reporting rows under file_path."""
+    if timings is not None:
+        timings['bytes'] = len(raw_content)
+    if max_bytes is not None and len(raw_content) > max_bytes:
+        logger.warning(f"Skipping {file_path}: {len(raw_content)} bytes is over the {max_bytes} byte limit")
+        return _skipped(file_path, 'too_large', f"{len(raw_content)} bytes")
+    if cache is not None:
+        if blob_sha is None:
+            blob_sha = git_blob_sha(raw_content)
+        cached = cache.get(blob_sha)
+        if cached is not None:
+            if timings is not None:
+                timings['cached'] = True
+            return _rows_from_cache(file_path, cached)
+    
     try:
-        tree = ast.parse(file_content)
-        visitor = AssertionVisitor(file_path)
-        visitor.line_mapping = build_line_mapping(file_path)
+        start = time.perf_counter()
+        tree, source = parse_source(raw_content)
+        parsed = time.perf_counter()
+        visitor = AssertionVisitor(file_path, source)
         visitor.visit(tree)
-        return visitor.assertions
+        if timings is not None:
+            timings['parse'] = parsed - start
+            timings['visit'] = time.perf_counter() - parsed
     except SyntaxError as e:
         logger.warning(f"Syntax error in {file_path}: {str(e)}")
-        return []
+        return _skipped(file_path, 'syntax_error', str(e))
+    except RecursionError as e:
+        # deeply nested expressions overflow the parser or the compiler's recursion limit
+        logger.warning(f"Nesting too deep in {file_path}: {str(e)}")
+        return _skipped(file_path, 'recursion', str(e))
+    except MemoryError:
+        logger.warning(f"Out of memory analyzing {file_path}")
+        return _skipped(file_path, 'memory', "out of memory while parsing")
     except Exception as e:
         logger.warning(f"Error analyzing {file_path}: {str(e)}")
-        return []
+        return _skipped(file_path, 'error', str(e))
+    
+    if cache is not None:
+        cache.put(blob_sha, visitor.assertions.cache_rows())
+    return visitor.assertions
 
-def clone_github_repo(github_url: str) -> str:
+class _StoreOnly:
+    """Cache wrapper that skips lookups but still stores results."""
     
-    temp_dir = tempfile.mkdtemp()
-    logger.info(f"Cloning {github_url} to {temp_dir}")
+    def __init__(self, cache: ResultCache):
+        self._cache = cache
+        
+    def get(self, content_sha: str):
+        return None
+        
+    def put(self, content_sha: str, rows):
+        self._cache.put(content_sha, rows)
+
+def _rows_from_cache(file_path: str, cached: List[CacheRow]) -> AssertionTable:
+    table = AssertionTable()
+    table.extend_file(file_path, cached)
+    return table
+
+class ChunkResult(NamedTuple):
+    results: List[AssertionTable]
+    hits: int
+    misses: int
+    timings: Optional[List[Dict]]
+    peak_rss: Optional[int]
+    # cache bookkeeping for the parent to apply: content SHAs hit and entries stored
+    cache_used: Sequence[str] = ()
+    cache_stored: int = 0
+
+def _analyze_chunk(items: List[Union[str, BlobSource]], cache: Optional[ResultCache] = None,
+                   profile: bool = False, max_bytes: Optional[int] = None) -> ChunkResult:
+    """Analyze a chunk of files or in-memory blobs inside a worker process.
+
+    Returns the per-file results plus the cache hits, misses and usage seen while
+    doing so and, when profiling, per-file timings and the worker's peak RSS.
+    """
+    hits = cache.hits if cache else 0
+    misses = cache.misses if cache else 0
+    results = []
+    all_timings = [] if profile else None
+    for item in items:
+        timings = {} if profile else None
+        if isinstance(item, BlobSource):
+            logger.info(f"Analyzing {item.path} ({item.blob_sha[:12]})")
+            results.append(analyze_source(item.path, item.data, cache, item.blob_sha, timings, max_bytes))
+        else:
+            logger.info(f"Analyzing {item}")
+            results.append(analyze_file(item, cache, timings=timings, max_bytes=max_bytes))
+        if profile:
+            all_timings.append(timings)
+    used, stored = cache.take_usage() if cache else ((), 0)
+    return ChunkResult(
+        results,
+        cache.hits - hits if cache else 0,
+        cache.misses - misses if cache else 0,
+        all_timings,
+        peak_rss_bytes() if profile else None,
+        used,
+        stored
+    )
+
+def _lost_chunk(items: List[Union[str, BlobSource]], error: Exception, profile: bool) -> ChunkResult:
+    """Stand-in result for a chunk whose worker was killed or died."""
+    reason = 'timeout' if isinstance(error, TaskTimeout) else 'crashed'
+    results = []
+    for item in items:
+        path = item.path if isinstance(item, BlobSource) else item
+        logger.warning(f"Skipping {path}: {str(error)}")
+        results.append(_skipped(path, reason, str(error)))
+    return ChunkResult(results, 0, 0, [{'skipped': reason} for _ in items] if profile else None, None)
+
+def _iter_chunks(items: Iterable, chunksize: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_analyze_files(file_paths: Iterable[Union[str, BlobSource]], workers: Optional[int] = None,
+                       chunksize: int = DEFAULT_CHUNK_SIZE,
+                       progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+                       cache: Optional[ResultCache] = None,
+                       executor: Optional[Executor] = None,
+                       profiler: Optional[Profiler] = None,
+                       max_bytes: Optional[int] = None,
+                       time_budget: Optional[float] = None) -> Iterator[AssertionTable]:
+    """Yield the assertions of each file, in input order, fanning out over a
+    process pool when workers > 1.
+
+    file_paths may be a lazy iterator, and may hold BlobSource items read from
+    the git object database instead of paths on disk; only a bounded number of
+    chunks is in flight at once so memory stays flat. progress_callback is called with
+    (files_done, total_files) as each chunk completes; total_files is None when
+    file_paths has no length. An existing executor (e.g. a pool shared by
+    several repositories) may be passed in; it is not shut down afterwards.
+    When a profiler is given, per-file read/parse/visit timings are recorded in it.
+    
+    Files over max_bytes are skipped. The pool is a GuardedPool, so a worker
+    that dies only loses its own chunk: its files are retried one per task and
+    a file that takes a worker down again is skipped. With a time_budget,
+    files run one per task, and a file still being analyzed after that many
+    seconds has its worker killed and is skipped; an executor that is a
+    GuardedPool with a timeout is used the same way. Skipped files are listed
+    in the skipped attribute of their (empty) result.
+    """
+    total = len(file_paths) if hasattr(file_paths, '__len__') else None
+    if workers is None:
+        workers = os.cpu_count() or 1
+    guarded = time_budget is not None if executor is None else (
+        isinstance(executor, GuardedPool) and executor.timeout is not None)
+    if guarded:
+        # a killed worker loses its whole task, so each file gets its own
+        chunksize = 1
+    chunks = _iter_chunks(file_paths, max(1, chunksize))
+    profile = profiler is not None
+    done = 0
+    
+    def record(chunk, result):
+        for item, timings in zip(chunk, result.timings):
+            profiler.record_file(item.path if isinstance(item, BlobSource) else item, timings, result.peak_rss)
+    
+    if workers <= 1 and executor is None and not guarded:
+        for chunk in chunks:
+            result = _analyze_chunk(chunk, cache, profile, max_bytes)
+            if cache is not None:
+                cache.record_usage(result.cache_used, result.cache_stored)
+            if profile:
+                record(chunk, result)
+            done += len(chunk)
+            if progress_callback:
+                progress_callback(done, total)
+            yield from result.results
+        return
     
+    # keep a couple of chunks queued per worker; results are consumed in
+    # submission order so output matches the serial path
+    max_pending = workers * 2
+    pending = deque()
+    
+    def outcome(future, chunk):
+        try:
+            return future.result()
+        except (TaskTimeout, WorkerCrashed, BrokenProcessPool) as e:
+            return _lost_chunk(chunk, e, profile)
+
+    def collect(pool, future_and_chunk):
+        nonlocal done
+        future, chunk = future_and_chunk
+        try:
+            parts = [(chunk, future.result())]
+        except WorkerCrashed as e:
+            if len(chunk) == 1:
+                parts = [(chunk, _lost_chunk(chunk, e, profile))]
+            else:
+                # one file took the worker down with the whole chunk; retry each file alone to find it
+                logger.warning(f"Worker died on a chunk of {len(chunk)} files; retrying them one by one")
+                retries = [(pool.submit(_analyze_chunk, [item], cache, profile, max_bytes), [item])
+                           for item in chunk]
+                parts = [(item, outcome(retry, item)) for retry, item in retries]
+        except (TaskTimeout, BrokenProcessPool) as e:
+            parts = [(chunk, _lost_chunk(chunk, e, profile))]
+        results = []
+        for part, result in parts:
+            if cache is not None:
+                cache.hits += result.hits
+                cache.misses += result.misses
+                cache.record_usage(result.cache_used, result.cache_stored)
+            if profile:
+                record(part, result)
+            results.extend(result.results)
+        done += len(chunk)
+        if progress_callback:
+            progress_callback(done, total)
+        return results
+    
+    def run(pool):
+        for chunk in chunks:
+            pending.append((pool.submit(_analyze_chunk, chunk, cache, profile, max_bytes), chunk))
+            if len(pending) >= max_pending:
+                yield from collect(pool, pending.popleft())
+        while pending:
+            yield from collect(pool, pending.popleft())
+    
+    if executor is not None:
+        yield from run(executor)
+    else:
+        with GuardedPool(workers, time_budget) as pool:
+            yield from run(pool)
+
+def analyze_files(file_paths: List[str], workers: Optional[int] = None,
+                  chunksize: int = DEFAULT_CHUNK_SIZE,
+                  progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+                  cache: Optional[ResultCache] = None,
+                  profiler: Optional[Profiler] = None,
+                  max_bytes: Optional[int] = None,
+                  time_budget: Optional[float] = None) -> AssertionTable:
+    """Analyze many files and return all of their assertions as one table."""
+    all_assertions = AssertionTable()
+    for file_assertions in iter_analyze_files(file_paths, workers, chunksize, progress_callback, cache,
+                                              profiler=profiler, max_bytes=max_bytes, time_budget=time_budget):
+        all_assertions.extend(file_assertions)
+    return all_assertions
+
+def clone_github_repo(github_url: str) -> str:
+    """Clone the repository into a temporary directory owned by the caller.
+
+    Only Python files at the tip of the default branch are checked out.
+    Raises CloneError if the repository cannot be cloned.
+    """
     try:
-        git.Repo.clone_from(github_url, temp_dir)
-        return temp_dir
-    except git.GitCommandError as e:
+        return CloneManager().checkout(github_url).path
+    except CloneError as e:
         logger.error(f"Failed to clone repository: {str(e)}")
-        sys.exit(1)
+        raise
+
+class AssertionWriter:
+    """Incrementally writes assertion rows to a CSV or JSON Lines file.
 
-def write_assertions_to_csv(assertions: List[Dict], output_file: str):
+    Rows are flushed to disk after every write() call, so output appears as
+    files are analyzed rather than at the end of the run. extra_fields names
+    additional row keys written after the standard columns.
+    """
     
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['filepath', 'testclass', 'testname', 'line number', 'assert string'])
+    def __init__(self, output_file: str, output_format: str = 'csv', extra_fields: Sequence[str] = ()):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.output_file = output_file
+        self.output_format = output_format
+        self.extra_fields = tuple(extra_fields)
+        self.count = 0
+        self._file = open(output_file, 'w', newline='', encoding='utf-8')
+        if output_format == 'csv':
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(CSV_HEADER + list(self.extra_fields))
+            
+    def write(self, assertions: Union[AssertionTable, Iterable[Dict]]) -> int:
+        """Write a batch of rows and flush them; returns the number written."""
+        written = 0
+        keys = ROW_KEYS + self.extra_fields
+        if isinstance(assertions, AssertionTable) and not self.extra_fields:
+            # tables are written column-wise without materializing row dicts
+            if self.output_format == 'csv':
+                self._csv.writerows(assertions.iter_tuples())
+            else:
+                for row in assertions.iter_tuples():
+                    self._file.write(json.dumps(dict(zip(ROW_KEYS, row)), ensure_ascii=False))
+                    self._file.write('\n')
+            written = len(assertions)
+        elif self.output_format == 'csv':
+            for assertion in assertions:
+                self._csv.writerow([assertion[key] for key in keys])
+                written += 1
+        else:
+            for assertion in assertions:
+                self._file.write(json.dumps({key: assertion[key] for key in keys}, ensure_ascii=False))
+                self._file.write('\n')
+                written += 1
+        self._file.flush()
+        self.count += written
+        return written
         
-        for assertion in assertions:
-            writer.writerow([
-                assertion['filepath'],
-                assertion['testclass'],
-                assertion['testname'],
-                assertion['line_number'],
-                assertion['assert_string']
-            ])
+    def close(self):
+        self._file.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
+
+def write_assertions_to_csv(assertions: Union[AssertionTable, Iterable[Dict]], output_file: str) -> int:
+    """Write assertions to a CSV file; assertions may be any iterable of rows."""
+    with AssertionWriter(output_file, 'csv') as writer:
+        return writer.write(assertions)
+
+def write_skipped(skipped: Iterable[SkippedFile], output_file: str, output_format: str = 'csv') -> int:
+    """Write the files left out of the results, with the reason, next to the assertion output."""
+    count = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        if output_format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(SKIPPED_FIELDS)
+            for entry in skipped:
+                writer.writerow(entry)
+                count += 1
+        else:
+            for entry in skipped:
+                f.write(json.dumps(entry._asdict(), ensure_ascii=False))
+                f.write('\n')
+                count += 1
+    return count
+
+def read_assertions(input_file: str) -> Iterator[Dict]:
+    """Read rows back from a CSV or JSON Lines file written by AssertionWriter."""
+    with open(input_file, 'r', newline='', encoding='utf-8') as f:
+        if input_file.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        # CSV headers use spaces ("line number"); rows use the dict keys
+        keys = [ROW_KEYS[CSV_HEADER.index(name)] if name in CSV_HEADER else name for name in header]
+        for values in reader:
+            row = dict(zip(keys, values))
+            row['line_number'] = int(row['line_number'])
+            yield row
 
 def extract_repo_name(github_url: str) -> str:
    
@@ -185,33 +644,138 @@ def extract_repo_name(github_url: str) -> str:
         github_url = github_url[:-1]
     return github_url.split('/')[-1]
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Extract test assertions from a GitHub repository")
+    parser.add_argument("github_url", help="URL of the repository to analyze")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: CPU count, 1 = serial)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="files submitted to a worker per task")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory for the persistent per-file result cache (disabled if omitted)")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="size bound for the result cache in megabytes")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='csv',
+                        help="output format: csv or newline-delimited json")
+    parser.add_argument("--output", default=None,
+                        help="output file (default: <repo>_assertions.<format>)")
+    parser.add_argument("--include", action="append", default=None, metavar="GLOB",
+                        help="only analyze files matching this glob (repeatable)")
+    parser.add_argument("--exclude", action="append", default=None, metavar="GLOB",
+                        help="skip files and directories matching this glob (repeatable)")
+    parser.add_argument("--no-git-index", action="store_true",
+                        help="walk the filesystem instead of listing tracked files from git")
+    parser.add_argument("--clone-cache", default=None, metavar="DIR",
+                        help="keep bare mirrors of cloned repositories here and update them with a fetch")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="history depth to fetch (0 = full history)")
+    parser.add_argument("--all-files", action="store_true",
+                        help="check out every file instead of only Python files")
+    parser.add_argument("--rev", default=None,
+                        help="branch, tag or SHA to analyze; files are read straight from the git "
+                             "object database without a checkout")
+    parser.add_argument("--profile", nargs='?', const='', default=None, metavar="FILE",
+                        help="write per-stage timings and the slowest files as JSON "
+                             "(default file: <repo>_profile.json)")
+    parser.add_argument("--profile-top", type=int, default=20,
+                        help="number of slowest files listed in the profile")
+    parser.add_argument("--max-file-size", type=float, default=DEFAULT_MAX_FILE_MB, metavar="MB",
+                        help="skip test files larger than this (0 = no limit)")
+    parser.add_argument("--time-budget", type=float, default=None, metavar="SECONDS",
+                        help="kill and skip the analysis of any file taking longer than this")
+    parser.add_argument("--skipped", default=None, metavar="FILE",
+                        help="report of skipped files (default: <repo>_skipped.<format>)")
+    parser.add_argument("--store", default=None, metavar="DB",
+                        help="also save the results in this SQLite result store, keyed by repository and commit")
+    return parser.parse_args(argv)
+
+def _stage(profiler: Optional[Profiler], name: str, track_memory: bool = True):
+    return profiler.stage(name, track_memory) if profiler else contextlib.nullcontext()
+
 def main():
-    if len(sys.argv) != 2:
-        logger.error("Usage: python assertion_extractor.py <github_url>")
-        sys.exit(1)
+    args = parse_args()
         
-    github_url = sys.argv[1]
+    github_url = args.github_url
     repo_name = extract_repo_name(github_url)
-    output_file = f"{repo_name}_assertions.csv"
-    
+    output_file = args.output or f"{repo_name}_assertions.{args.format}"
+    skipped_file = args.skipped or f"{repo_name}_skipped.{args.format}"
+    max_bytes = int(args.max_file_size * 1024 * 1024) if args.max_file_size > 0 else None
+    skipped = []
     
-    repo_dir = clone_github_repo(github_url)
+    cache = None
+    if args.cache_dir:
+        cache = ResultCache(args.cache_dir, EXTRACTOR_VERSION, max_bytes=args.cache_max_mb * 1024 * 1024)
     
-    # find all test files
-    test_files = get_test_files(repo_dir)
-    logger.info(f"Found {len(test_files)} test files")
+    profiler = Profiler() if args.profile is not None else None
+    stored = AssertionTable() if args.store else None
+    committed_at = None
     
+    # the checkout is removed when the manager exits, even on errors
+    with CloneManager(args.clone_cache, depth=args.depth, python_only=not args.all_files) as clones:
+        try:
+            with _stage(profiler, 'clone'):
+                if args.rev:
+                    repo, sha = resolve_repo(github_url, args.rev, clones)
+                    # tree paths are already relative to the repository root
+                    repo_dir = None
+                    committed_at = repo.commit(sha).committed_date
+                else:
+                    repo_dir, sha = clones.checkout(github_url)
+                    if stored is not None:
+                        # an exported checkout has no history; the commit is in the cached mirror then
+                        committed_at = commit_time(clones.mirror_path(github_url) if clones.cache_dir else repo_dir, sha)
+        except CloneError as e:
+            logger.error(f"Failed to clone repository: {str(e)}")
+            sys.exit(1)
+        
+        # files stream from discovery through analysis straight into the writer
+        with _stage(profiler, 'analyze'):
+            if args.rev:
+                logger.info(f"Reading test files of {sha} from the object database")
+                with _stage(profiler, 'discover', track_memory=False):
+                    tree_files = list_tree_files(repo, sha, args.include, args.exclude)
+                test_files = iter_blob_sources(repo, tree_files)
+                if profiler:
+                    test_files = profiler.timed_iter('read', test_files)
+            else:
+                test_files = iter_test_files(repo_dir, args.include, args.exclude, use_git=not args.no_git_index)
+                if profiler:
+                    test_files = profiler.timed_iter('discover', test_files)
+            file_count = 0
+            with AssertionWriter(output_file, args.format) as writer:
+                for file_assertions in iter_analyze_files(test_files, workers=args.workers, chunksize=args.chunk_size,
+                                                          cache=cache, profiler=profiler, max_bytes=max_bytes,
+                                                          time_budget=args.time_budget):
+                    with _stage(profiler, 'write', track_memory=False):
+                        writer.write(file_assertions)
+                    skipped.extend(file_assertions.skipped)
+                    if stored is not None:
+                        stored.extend(file_assertions)
+                    file_count += 1
+        if args.rev:
+            repo.close()
+        
+        if stored is not None:
+            # local repositories are stored under their absolute path, so the key does not depend on the cwd
+            store_url = os.path.abspath(github_url) if os.path.isdir(github_url) else github_url
+            with ResultStore(args.store) as store:
+                store.save(store_url, sha, stored, EXTRACTOR_VERSION, label=args.rev,
+                           committed_at=committed_at, root=repo_dir, file_count=file_count)
+            logger.info(f"Saved {len(stored)} assertions of {sha[:12]} to {args.store}")
     
-    all_assertions = []
-    for file_path in test_files:
-        logger.info(f"Analyzing {file_path}")
-        file_assertions = analyze_file(file_path)
-        all_assertions.extend(file_assertions)
+    if cache is not None:
+        logger.info(f"Result cache: {cache.hits} hits, {cache.misses} misses")
+        cache.close()
     
-    # output csv generation
-    write_assertions_to_csv(all_assertions, output_file)
-    logger.info(f"Found {len(all_assertions)} assertions in total")
+    logger.info(f"Analyzed {file_count} test files")
+    logger.info(f"Found {writer.count} assertions in total")
     logger.info(f"Results written to {output_file}")
+    if skipped:
+        write_skipped(skipped, skipped_file, args.format)
+        logger.warning(f"Skipped {len(skipped)} files, listed in {skipped_file}")
+    
+    if profiler is not None:
+        profiler.write_report(args.profile or f"{repo_name}_profile.json", args.profile_top)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
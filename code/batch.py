@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import os
+import csv
+import sys
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+
+from assertion_extractor import (
+    iter_analyze_files, write_skipped, AssertionWriter, extract_repo_name,
+    EXTRACTOR_VERSION, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_FILE_MB, OUTPUT_FORMATS
+)
+from clone_manager import CloneManager, CloneError
+from git_source import resolve_repo, list_tree_files, iter_blob_sources
+from guarded_pool import GuardedPool
+from records import AssertionTable
+from result_cache import ResultCache
+from result_store import ResultStore
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ['url', 'rev', 'sha', 'status', 'attempts', 'files', 'assertions', 'skipped',
+                  'clone_seconds', 'analyze_seconds', 'output', 'error']
+
+
+class ManifestEntry(NamedTuple):
+    url: str
+    rev: Optional[str] = None
+
+
+class RepoSummary(NamedTuple):
+    url: str
+    rev: Optional[str]
+    sha: Optional[str]
+    status: str
+    attempts: int
+    files: int
+    assertions: int
+    skipped: int
+    clone_seconds: float
+    analyze_seconds: float
+    output: Optional[str]
+    error: Optional[str]
+
+
+def read_manifest(manifest_file: str) -> List[ManifestEntry]:
+    """Read a manifest with one repository per line: "<url> [rev]". Blank lines and # comments are ignored."""
+    entries = []
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                parts = line.split()
+                entries.append(ManifestEntry(parts[0], parts[1] if len(parts) > 1 else None))
+    return entries
+
+
+def _output_names(entries: Sequence[ManifestEntry]) -> List[str]:
+    """Pick an output name per entry, disambiguating repos that share a name."""
+    names = [extract_repo_name(entry.url) for entry in entries]
+    keys = [f"{entry.url}@{entry.rev or ''}" for entry in entries]
+    duplicated = {name for name in names if names.count(name) > 1}
+    return [
+        f"{name}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}" if name in duplicated else name
+        for name, key in zip(names, keys)
+    ]
+
+
+class BatchRunner:
+    """Runs the extractor over many repositories at once.
+
+    Each repository is handled by a thread: fetching is limited to clone_workers
+    concurrent clones (retried with exponential backoff), while parsing for all
+    repositories shares one process pool, so network-bound and CPU-bound work
+    overlap. A failing repository is recorded in the summary instead of
+    stopping the run. With a store, each repository's results are also saved
+    there under its URL and commit. Files over max_bytes, or that take longer
+    than time_budget seconds, are skipped and listed in <name>_skipped.<format>.
+    """
+
+    def __init__(self, output_dir: str, output_format: str = 'csv', clone_workers: int = 4,
+                 workers: Optional[int] = None, chunksize: int = DEFAULT_CHUNK_SIZE,
+                 retries: int = 2, retry_delay: float = 2.0,
+                 cache: Optional[ResultCache] = None, clone_cache: Optional[str] = None,
+                 include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None,
+                 store: Optional[ResultStore] = None, max_bytes: Optional[int] = None,
+                 time_budget: Optional[float] = None):
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.clone_workers = max(1, clone_workers)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cache = cache
+        self.clone_cache = clone_cache
+        self.include = include
+        self.exclude = exclude
+        self.store = store
+        self.max_bytes = max_bytes
+        self.time_budget = time_budget
+        self._clone_slots = threading.BoundedSemaphore(self.clone_workers)
+
+    def run(self, entries: Sequence[ManifestEntry]) -> List[RepoSummary]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        names = _output_names(entries)
+        # enough threads that every clone slot and every worker can be busy at once
+        max_repos = self.clone_workers + self.workers
+        # a GuardedPool replaces a worker that dies, so one bad file cannot break the pool for every repository
+        pool = GuardedPool(self.workers, self.time_budget)
+        with CloneManager(self.clone_cache, depth=1) as clones, pool, \
+                ThreadPoolExecutor(max_workers=max_repos, thread_name_prefix='repo') as threads:
+            futures = [
+                threads.submit(self._run_repo, entry, name, clones, pool)
+                for entry, name in zip(entries, names)
+            ]
+            return [future.result() for future in futures]
+
+    def _run_repo(self, entry: ManifestEntry, name: str, clones: CloneManager, pool: Executor) -> RepoSummary:
+        attempts, files, assertions = 0, 0, 0
+        skipped = []
+        clone_seconds, analyze_seconds = 0.0, 0.0
+        sha, output_file = None, None
+        start = time.perf_counter()
+        try:
+            while True:
+                attempts += 1
+                try:
+                    with self._clone_slots:
+                        repo, sha = resolve_repo(entry.url, entry.rev, clones)
+                    break
+                except CloneError as e:
+                    if attempts > self.retries:
+                        raise
+                    delay = self.retry_delay * 2 ** (attempts - 1)
+                    logger.warning(f"Clone of {entry.url} failed (attempt {attempts}), "
+                                   f"retrying in {delay:.0f}s: {str(e)}")
+                    time.sleep(delay)
+            clone_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            # temporary clones are dropped as soon as the repo is done, even if its analysis fails;
+            # mirrors stay cached
+            try:
+                output_file = os.path.join(self.output_dir, f"{name}_assertions.{self.output_format}")
+                sources = iter_blob_sources(repo, list_tree_files(repo, sha, self.include, self.exclude))
+                stored = AssertionTable() if self.store is not None else None
+                with AssertionWriter(output_file, self.output_format) as writer:
+                    for file_assertions in iter_analyze_files(sources, workers=self.workers,
+                                                              chunksize=self.chunksize, cache=self.cache,
+                                                              executor=pool, max_bytes=self.max_bytes):
+                        writer.write(file_assertions)
+                        skipped.extend(file_assertions.skipped)
+                        if stored is not None:
+                            stored.extend(file_assertions)
+                        files += 1
+                assertions = writer.count
+                if skipped:
+                    write_skipped(skipped, os.path.join(self.output_dir, f"{name}_skipped.{self.output_format}"),
+                                  self.output_format)
+                if stored is not None:
+                    url = os.path.abspath(entry.url) if os.path.isdir(entry.url) else entry.url
+                    self.store.save(url, sha, stored, EXTRACTOR_VERSION, label=entry.rev,
+                                    committed_at=repo.commit(sha).committed_date, file_count=files)
+                analyze_seconds = time.perf_counter() - start
+            finally:
+                repo.close()
+                clones.release(repo.git_dir)
+            logger.info(f"{entry.url}: {assertions} assertions in {files} files, {len(skipped)} skipped")
+            return RepoSummary(entry.url, entry.rev, sha, 'ok', attempts, files, assertions, len(skipped),
+                               round(clone_seconds, 3), round(analyze_seconds, 3), output_file, None)
+        except Exception as e:
+            if sha is None:
+                clone_seconds = time.perf_counter() - start
+            else:
+                analyze_seconds = time.perf_counter() - start
+            logger.error(f"{entry.url}: {str(e)}")
+            return RepoSummary(entry.url, entry.rev, sha, 'failed', attempts, files, assertions, len(skipped),
+                               round(clone_seconds, 3), round(analyze_seconds, 3), output_file, str(e))
+
+
+def write_summary(summaries: Sequence[RepoSummary], summary_file: str):
+    with open(summary_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_FIELDS)
+        for summary in summaries:
+            writer.writerow(['' if value is None else value for value in summary])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Extract test assertions from many repositories")
+    parser.add_argument("manifest", help="file with one repository per line: <url> [rev]")
+    parser.add_argument("--output-dir", default="assertions", help="directory for per-repo outputs and summary.csv")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument("--clone-workers", type=int, default=4, help="concurrent clones")
+    parser.add_argument("--workers", type=int, default=None, help="analysis worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--retries", type=int, default=2, help="retries for a failed clone")
+    parser.add_argument("--retry-delay", type=float, default=2.0, help="initial delay between retries in seconds")
+    parser.add_argument("--cache-dir", default=None, help="directory of the per-file result cache")
+    parser.add_argument("--clone-cache", default=None, metavar="DIR", help="directory of cached mirrors")
+    parser.add_argument("--include", action="append", default=None, metavar="GLOB")
+    parser.add_argument("--exclude", action="append", default=None, metavar="GLOB")
+    parser.add_argument("--max-file-size", type=float, default=DEFAULT_MAX_FILE_MB, metavar="MB",
+                        help="skip test files larger than this (0 = no limit)")
+    parser.add_argument("--time-budget", type=float, default=None, metavar="SECONDS",
+                        help="kill and skip the analysis of any file taking longer than this")
+    parser.add_argument("--store", default=None, metavar="DB", help="also save every repository in this SQLite result store")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    entries = read_manifest(args.manifest)
+    if not entries:
+        logger.error(f"No repositories listed in {args.manifest}")
+        sys.exit(1)
+    cache = ResultCache(args.cache_dir, EXTRACTOR_VERSION) if args.cache_dir else None
+    store = ResultStore(args.store) if args.store else None
+
+    runner = BatchRunner(args.output_dir, args.format, clone_workers=args.clone_workers,
+                         workers=args.workers, chunksize=args.chunk_size, retries=args.retries,
+                         retry_delay=args.retry_delay, cache=cache, clone_cache=args.clone_cache,
+                         include=args.include, exclude=args.exclude, store=store,
+                         max_bytes=int(args.max_file_size * 1024 * 1024) if args.max_file_size > 0 else None,
+                         time_budget=args.time_budget)
+    summaries = runner.run(entries)
+    if cache is not None:
+        cache.close()
+    if store is not None:
+        store.close()
+
+    summary_file = os.path.join(args.output_dir, "summary.csv")
+    write_summary(summaries, summary_file)
+    failed = [s for s in summaries if s.status != 'ok']
+    logger.info(f"Processed {len(summaries)} repositories, {len(failed)} failed, "
+                f"{sum(s.assertions for s in summaries)} assertions in total")
+    logger.info(f"Summary written to {summary_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+from typing import Dict, List, NamedTuple, Optional
+
+import git
+
+from assertion_extractor import (
+    get_test_files, analyze_files, write_assertions_to_csv,
+    EXTRACTOR_VERSION, DEFAULT_CHUNK_SIZE
+)
+from git_source import list_tree_files, iter_blob_sources
+from profiling import Profiler
+
+logger = logging.getLogger(__name__)
+
+STYLES = ('pytest', 'unittest', 'mixed')
+
+# fixed identity and dates so the generated commit is byte-for-byte reproducible
+_GIT_ENV = {
+    'GIT_AUTHOR_NAME': 'bench', 'GIT_AUTHOR_EMAIL': 'bench@localhost',
+    'GIT_COMMITTER_NAME': 'bench', 'GIT_COMMITTER_EMAIL': 'bench@localhost',
+    'GIT_AUTHOR_DATE': '2000-01-01T00:00:00Z', 'GIT_COMMITTER_DATE': '2000-01-01T00:00:00Z',
+}
+
+
+class CorpusSpec(NamedTuple):
+    """Shape of a synthetic test corpus; the same spec always yields the same files."""
+    files: int = 200
+    tests_per_file: int = 20
+    assertions_per_test: int = 4
+    filler_lines: int = 4
+    class_depth: int = 1
+    style: str = 'mixed'
+    helper_files: int = 20
+    seed: int = 0
+
+
+def _pytest_assertion(rng: random.Random, indent: str, n: int) -> List[str]:
+    kind = rng.randrange(5)
+    if kind == 0:
+        return [f"{indent}assert value_{n} == expected_{n}"]
+    if kind == 1:
+        return [f"{indent}assert value_{n} in {{1, 2, 3}}, 'value_{n} out of range'"]
+    if kind == 2:
+        return [f"{indent}assert not isinstance(value_{n}, str)"]
+    if kind == 3:
+        return [f"{indent}with pytest.raises(ValueError):", f"{indent}    int('x{n}')"]
+    # a multi-line assertion exercises source slicing across lines
+    return [f"{indent}assert (", f"{indent}    value_{n} >= 0", f"{indent}    and value_{n} < 100", f"{indent})"]
+
+
+def _unittest_assertion(rng: random.Random, indent: str, n: int) -> List[str]:
+    kind = rng.randrange(5)
+    if kind == 0:
+        return [f"{indent}self.assertEqual(value_{n}, expected_{n})"]
+    if kind == 1:
+        return [f"{indent}self.assertIn(value_{n}, [1, 2, 3])"]
+    if kind == 2:
+        return [f"{indent}self.assertTrue(value_{n} > 0, msg='value_{n} must be positive')"]
+    if kind == 3:
+        return [f"{indent}with self.assertRaises(ValueError):", f"{indent}    int('x{n}')"]
+    return [f"{indent}self.assertAlmostEqual(", f"{indent}    value_{n},", f"{indent}    expected_{n},",
+            f"{indent}    places=3,", f"{indent})"]
+
+
+def _test_body(rng: random.Random, spec: CorpusSpec, indent: str, unittest_style: bool) -> List[str]:
+    assertion = _unittest_assertion if unittest_style else _pytest_assertion
+    lines = []
+    for n in range(spec.assertions_per_test):
+        lines.append(f"{indent}value_{n} = helper({rng.randrange(1000)}) % 100")
+        lines.append(f"{indent}expected_{n} = value_{n}")
+        lines.extend(assertion(rng, indent, n))
+    for n in range(spec.filler_lines):
+        lines.append(f"{indent}data_{n} = [x * {rng.randrange(1, 10)} for x in range({rng.randrange(1, 50)})]")
+    return lines or [f"{indent}pass"]
+
+
+def render_test_module(spec: CorpusSpec, index: int) -> str:
+    """Render one synthetic test module."""
+    rng = random.Random(f"{spec.seed}-{index}")
+    if spec.style == 'mixed':
+        unittest_style = index % 2 == 1
+    else:
+        unittest_style = spec.style == 'unittest'
+    lines = ["import unittest", "import pytest", "", "", "def helper(value):", "    return value * 7", ""]
+
+    if not unittest_style:
+        for t in range(spec.tests_per_file):
+            lines += ["", f"def test_case_{index}_{t}():"]
+            lines += _test_body(rng, spec, "    ", False)
+            lines.append("")
+        return "\n".join(lines) + "\n"
+
+    # unittest modules spread their tests over classes nested class_depth deep
+    depth = max(1, spec.class_depth)
+    for t in range(spec.tests_per_file):
+        indent = ""
+        for level in range(depth):
+            base = "unittest.TestCase" if level == 0 else "object"
+            lines += ["", f"{indent}class TestCase{index}_{t}_{level}({base}):"]
+            indent += "    "
+        lines += [f"{indent}def test_method_{t}(self):"]
+        lines += _test_body(rng, spec, indent + "    ", True)
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(directory: str, spec: CorpusSpec) -> str:
+    """Write a synthetic repository with the given shape into directory and commit it.
+
+    Test modules are spread over a few packages, alongside helper modules that
+    discovery must skip. Returns the SHA of the single commit.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(spec.seed)
+    packages = [f"pkg{i}" for i in range(max(1, spec.files // 50))]
+    for index in range(spec.files):
+        package = packages[index % len(packages)]
+        path = os.path.join(directory, package, 'tests', f"test_module_{index}.py")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(render_test_module(spec, index))
+    for index in range(spec.helper_files):
+        path = os.path.join(directory, packages[index % len(packages)], f"util_{index}.py")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("".join(f"def util_{index}_{n}(x):\n    return x + {rng.randrange(100)}\n\n"
+                            for n in range(10)))
+
+    repo = git.Repo.init(directory)
+    repo.git.add('-A')
+    repo.git.commit('-q', '-m', f"synthetic corpus {spec}", env=_GIT_ENV)
+    sha = repo.head.commit.hexsha
+    repo.close()
+    return sha
+
+
+def _stage_report(entry: Dict, files: int, assertions: int) -> Dict:
+    seconds = entry['wall_seconds']
+    return dict(
+        entry,
+        files_per_second=round(files / seconds, 1) if seconds else None,
+        assertions_per_second=round(assertions / seconds, 1) if seconds else None,
+    )
+
+
+def run_benchmark(repo_dir: str, workers: int = 1, chunksize: int = DEFAULT_CHUNK_SIZE,
+                  mode: str = 'worktree') -> Dict:
+    """Run discovery, analysis and CSV writing once over repo_dir and report each stage.
+
+    mode 'worktree' reads files from disk; 'rev' reads blobs of HEAD from the
+    object database as --rev does. read, parse and visit times are summed over
+    files (CPU time across workers when workers > 1), the other stages are wall time.
+    """
+    profiler = Profiler()
+    output_file = os.path.join(tempfile.mkdtemp(prefix='assertain-bench-'), 'assertions.csv')
+    try:
+        if mode == 'rev':
+            repo = git.Repo(repo_dir)
+            with profiler.stage('discover'):
+                tree_files = list_tree_files(repo, 'HEAD')
+            with profiler.stage('read'):
+                test_files = list(iter_blob_sources(repo, tree_files))
+            repo.close()
+        else:
+            with profiler.stage('discover'):
+                test_files = get_test_files(repo_dir)
+        with profiler.stage('analyze'):
+            assertions = analyze_files(test_files, workers=workers, chunksize=chunksize, profiler=profiler)
+        with profiler.stage('write'):
+            write_assertions_to_csv(assertions, output_file)
+    finally:
+        shutil.rmtree(os.path.dirname(output_file), ignore_errors=True)
+
+    report = profiler.report(top_n=0)
+    files = report['files']['count']
+    total = len(assertions)
+    return {
+        'files': files,
+        'bytes': report['files']['bytes'],
+        'assertions': total,
+        'stages': {name: _stage_report(entry, files, total) for name, entry in report['stages'].items()},
+    }
+
+
+def _best_runs(runs: List[Dict]) -> Dict:
+    """Per stage, the run with the lowest wall time, which is the least noisy estimate."""
+    best = {}
+    for run in runs:
+        for name, entry in run['stages'].items():
+            if name not in best or entry['wall_seconds'] < best[name]['wall_seconds']:
+                best[name] = entry
+    return best
+
+
+def compare_reports(baseline: Dict, current: Dict) -> Dict[str, Optional[float]]:
+    """Speedup of current over baseline per stage (>1 means faster)."""
+    speedups = {}
+    for name, entry in current['best'].items():
+        before = baseline.get('best', {}).get(name)
+        if before and entry['wall_seconds']:
+            speedups[name] = round(before['wall_seconds'] / entry['wall_seconds'], 3)
+        else:
+            speedups[name] = None
+    return speedups
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = CorpusSpec()
+    parser = argparse.ArgumentParser(description="Benchmark the extractor on a generated test corpus")
+    parser.add_argument("--files", type=int, default=defaults.files, help="number of test modules")
+    parser.add_argument("--tests-per-file", type=int, default=defaults.tests_per_file)
+    parser.add_argument("--assertions-per-test", type=int, default=defaults.assertions_per_test)
+    parser.add_argument("--filler-lines", type=int, default=defaults.filler_lines,
+                        help="non-assertion statements per test, to grow file size")
+    parser.add_argument("--class-depth", type=int, default=defaults.class_depth,
+                        help="nesting depth of test classes in unittest-style modules")
+    parser.add_argument("--style", choices=STYLES, default=defaults.style)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--mode", choices=('worktree', 'rev'), default='worktree',
+                        help="read files from the working tree or from the object database")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs")
+    parser.add_argument("--corpus-dir", default=None,
+                        help="generate the corpus here and keep it (reused if it already exists)")
+    parser.add_argument("--output", default="benchmark.json", help="JSON report file")
+    parser.add_argument("--compare", default=None, metavar="JSON", help="earlier report to compare against")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    spec = CorpusSpec(args.files, args.tests_per_file, args.assertions_per_test, args.filler_lines,
+                      args.class_depth, args.style, seed=args.seed)
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix='assertain-corpus-')
+    try:
+        if os.path.isdir(os.path.join(corpus_dir, '.git')):
+            logger.info(f"Reusing corpus in {corpus_dir}")
+        else:
+            start = time.perf_counter()
+            generate_corpus(corpus_dir, spec)
+            logger.info(f"Generated {spec.files} test modules in {corpus_dir} "
+                        f"in {time.perf_counter() - start:.1f}s")
+
+        runs = []
+        for attempt in range(max(1, args.repeat)):
+            run = run_benchmark(corpus_dir, workers=args.workers, chunksize=args.chunk_size, mode=args.mode)
+            logger.info(f"Run {attempt + 1}: {run['assertions']} assertions in {run['files']} files, "
+                        f"analyze {run['stages']['analyze']['wall_seconds']}s")
+            runs.append(run)
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    report = {
+        'spec': spec._asdict(),
+        'settings': {'workers': args.workers, 'chunk_size': args.chunk_size, 'mode': args.mode},
+        'environment': {
+            'extractor_version': EXTRACTOR_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'runs': runs,
+        'best': _best_runs(runs),
+    }
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            report['speedup'] = compare_reports(json.load(f), report)
+        for name, speedup in report['speedup'].items():
+            logger.info(f"{name}: {speedup}x vs {args.compare}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    for name, entry in report['best'].items():
+        logger.info(f"{name}: {entry['wall_seconds']}s, {entry['files_per_second']} files/s, "
+                    f"{entry['assertions_per_second']} assertions/s, peak RSS {entry['peak_rss_mb']} MB")
+    logger.info(f"Benchmark report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
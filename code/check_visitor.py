@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+import os
+import ast
+import sys
+import logging
+import argparse
+import sysconfig
+from typing import List, Optional, Tuple
+
+from assertion_extractor import AssertionVisitor, get_test_files, is_test_name, parse_source
+
+logger = logging.getLogger(__name__)
+
+# (testclass, testname, line_number): what identifies a row, independent of how its text is sliced
+RowKey = Tuple[str, str, int]
+
+
+class ReferenceVisitor(ast.NodeVisitor):
+    """The original recursive visitor, kept as the specification AssertionVisitor must match.
+
+    The one intended difference is async functions: the original only knew
+    FunctionDef, so async tests were missed while async helpers nested in a
+    test were attributed to that test. Here an async function outside a test
+    is treated like any other function and one inside a test stays part of it.
+    """
+
+    def __init__(self):
+        self.rows: List[RowKey] = []
+        self.current_class = None
+        self.current_function = None
+
+    def _in_test(self) -> bool:
+        return bool(self.current_function) and is_test_name(self.current_function)
+
+    def _record(self, node):
+        if self._in_test():
+            self.rows.append((self.current_class or '', self.current_function, node.lineno))
+
+    def visit_ClassDef(self, node):
+        old_class = self.current_class
+        self.current_class = node.name
+        self.generic_visit(node)
+        self.current_class = old_class
+
+    def visit_FunctionDef(self, node):
+        old_function = self.current_function
+        self.current_function = node.name
+        self.generic_visit(node)
+        self.current_function = old_function
+
+    def visit_AsyncFunctionDef(self, node):
+        if self._in_test():
+            self.generic_visit(node)
+        else:
+            self.visit_FunctionDef(node)
+
+    def visit_Assert(self, node):
+        self._record(node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Attribute) and node.func.attr == 'raises':
+            if isinstance(node.func.value, ast.Name) and node.func.value.id == 'pytest':
+                self._record(node)
+        elif isinstance(node.func, ast.Attribute) and node.func.attr.startswith(('assert', 'Assert')):
+            self._record(node)
+        self.generic_visit(node)
+
+
+def compare_file(file_path: str) -> Optional[Tuple[List[RowKey], List[RowKey]]]:
+    """Return (reference rows, visitor rows) for a file, or None if it cannot be compared."""
+    try:
+        with open(file_path, 'rb') as f:
+            tree, source = parse_source(f.read())
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+    reference = ReferenceVisitor()
+    try:
+        reference.visit(tree)
+    except RecursionError:
+        # the recursive reference cannot walk every tree the iterative visitor can
+        return None
+    visitor = AssertionVisitor(file_path, source)
+    visitor.visit(tree)
+    rows = [(testclass, testname, line_number) for _, testclass, testname, line_number, _ in
+            visitor.assertions.iter_tuples()]
+    return reference.rows, rows
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check that AssertionVisitor finds the same rows as the original recursive visitor")
+    parser.add_argument("directories", nargs='*',
+                        default=[os.path.join(sysconfig.get_paths()['stdlib'], 'test')],
+                        help="directories of test files to compare on (default: the standard library's tests)")
+    parser.add_argument("--show", type=int, default=10, help="number of differing files to print")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    # the extractor logs every analyzed file; only the verdict matters here
+    logging.getLogger().setLevel(logging.WARNING)
+    files, skipped, rows = 0, 0, 0
+    differing = []
+    for directory in args.directories:
+        for file_path in get_test_files(directory, use_git=False):
+            result = compare_file(file_path)
+            if result is None:
+                skipped += 1
+                continue
+            expected, actual = result
+            files += 1
+            rows += len(expected)
+            if expected != actual:
+                differing.append((file_path, expected, actual))
+
+    for file_path, expected, actual in differing[:args.show]:
+        missing = sorted(set(expected) - set(actual))[:3]
+        extra = sorted(set(actual) - set(expected))[:3]
+        print(f"{file_path}: {len(expected)} reference rows, {len(actual)} visitor rows; "
+              f"missing {missing}, extra {extra}")
+    print(f"Compared {files} files ({rows} reference rows), {skipped} could not be parsed; "
+          f"{len(differing)} differ")
+    sys.exit(1 if differing or not files else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import os
+import re
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import logging
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+import git
+
+logger = logging.getLogger(__name__)
+
+# sparse-checkout / archive pathspec used when only Python files are wanted
+PYTHON_PATHSPEC = ':(glob)**/*.py'
+
+
+class CloneError(Exception):
+    """Raised when a repository cannot be cloned or a revision cannot be fetched."""
+
+
+class Checkout(NamedTuple):
+    path: str
+    sha: str
+
+
+def _normalize_url(url: str) -> str:
+    """Make a local repository path absolute; remotes are set up from inside a temporary directory."""
+    return os.path.abspath(url) if os.path.exists(url) else url
+
+
+def _cache_key(url: str) -> str:
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', url.rstrip('/').split('/')[-1]) or 'repo'
+    if name.endswith('.git'):
+        name = name[:-4]
+    return f"{hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]}-{name}"
+
+
+def ls_remote(url: str, rev: Optional[str] = None) -> str:
+    """Resolve rev (default: the remote HEAD) to a commit SHA without fetching anything.
+
+    Only branch and tag names can be resolved remotely; a full SHA is returned as is.
+    Annotated tags resolve to the commit they point at.
+    """
+    if rev and re.fullmatch(r'[0-9a-f]{40}', rev):
+        return rev
+    # ls-remote matches any ref ending in the pattern, so ask for the exact refs and filter on full names
+    refs = ['HEAD'] if not rev else [f'refs/heads/{rev}', f'refs/tags/{rev}', f'refs/tags/{rev}^{{}}']
+    try:
+        output = git.Git().ls_remote(url, *refs)
+    except git.GitCommandError as e:
+        raise CloneError(f"Failed to query {url}: {e.stderr.strip()}") from e
+    found = {}
+    for line in output.splitlines():
+        sha, ref = line.split('\t', 1)
+        found[ref] = sha
+    if not rev:
+        if 'HEAD' not in found:
+            raise CloneError(f"Unknown revision HEAD in {url}")
+        return found['HEAD']
+    branch = found.get(f'refs/heads/{rev}')
+    tag = found.get(f'refs/tags/{rev}^{{}}') or found.get(f'refs/tags/{rev}')
+    if branch and tag and branch != tag:
+        raise CloneError(f"Revision {rev} is ambiguous in {url}: it names both a branch and a tag")
+    if not (branch or tag):
+        raise CloneError(f"Unknown revision {rev} in {url}")
+    return branch or tag
+
+
+class CloneManager:
+    """Shallow, sparse clones with an optional on-disk mirror cache.
+
+    Without a cache_dir every checkout is a fresh depth-limited clone that only
+    materializes Python files (blobs for other files are filtered out when the
+    server supports partial clone). With a cache_dir, each URL gets a bare mirror
+    that later runs update with a fetch, and checkouts are exported from it.
+    A depth of 0 fetches full history. Temporary directories are removed by
+    cleanup(), which also runs when the manager is used as a context manager.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, depth: int = 1, python_only: bool = True):
+        self.cache_dir = cache_dir
+        self.depth = depth
+        self.python_only = python_only
+        self._temp_dirs: List[str] = []
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+    def _mkdtemp(self) -> str:
+        path = os.path.normpath(tempfile.mkdtemp(prefix='assertain-'))
+        self._temp_dirs.append(path)
+        return path
+
+    def manages(self, path: str) -> bool:
+        """Whether path is a temporary clone or cached mirror of this manager, and so safe to fetch into."""
+        path = os.path.normpath(os.path.abspath(path))
+        if path in self._temp_dirs:
+            return True
+        return bool(self.cache_dir) and os.path.dirname(path) == os.path.abspath(self.cache_dir)
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def fetch_into(self, repo: git.Repo, rev: Optional[str], partial: bool = False) -> str:
+        """Fetch rev (default: the remote HEAD) into repo and return its commit SHA."""
+        args = ['origin', rev or 'HEAD']
+        if self.depth > 0:
+            args.insert(0, f'--depth={self.depth}')
+        if partial:
+            args.insert(0, '--filter=blob:none')
+        try:
+            repo.git.fetch(*args)
+            return repo.git.rev_parse('FETCH_HEAD^{commit}')
+        except git.GitCommandError as e:
+            if rev is None:
+                raise CloneError(f"Failed to fetch {repo.remotes.origin.url}: {e.stderr.strip()}") from e
+        # some servers refuse to serve arbitrary SHAs; fall back to fetching all
+        # branches and tags with full history and resolving rev locally
+        try:
+            fetch_args = ['origin', '+refs/heads/*:refs/remotes/origin/*', '+refs/tags/*:refs/tags/*']
+            if repo.git.rev_parse('--is-shallow-repository') == 'true':
+                fetch_args.insert(0, '--unshallow')
+            repo.git.fetch(*fetch_args)
+            return repo.git.rev_parse(f'{rev}^{{commit}}')
+        except git.GitCommandError as e:
+            raise CloneError(f"Failed to fetch {rev} from {repo.remotes.origin.url}: {e.stderr.strip()}") from e
+
+    def mirror_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, _cache_key(_normalize_url(url)) + '.git')
+
+    def fetch(self, url: str, rev: Optional[str] = None) -> Checkout:
+        """Make rev available in a bare repository without checking anything out.
+
+        Returns the git directory and the resolved commit SHA. The directory is the
+        cached mirror when a cache_dir is set, otherwise a temporary bare clone.
+        """
+        url = _normalize_url(url)
+        if self.cache_dir:
+            git_dir = self.mirror_path(url)
+            with self._lock(git_dir):
+                created = not os.path.isdir(git_dir)
+                try:
+                    if created:
+                        logger.info(f"Creating cached mirror of {url} in {git_dir}")
+                        repo = git.Repo.init(git_dir, bare=True)
+                        repo.create_remote('origin', url)
+                    else:
+                        logger.info(f"Updating cached mirror of {url}")
+                        repo = git.Repo(git_dir)
+                    sha = self.fetch_into(repo, rev)
+                    # keep a ref so the fetched commit survives gc in the mirror
+                    repo.git.update_ref(f'refs/assertain/{_cache_key(rev or "HEAD")}', sha)
+                except (git.GitCommandError, CloneError) as e:
+                    if created:
+                        shutil.rmtree(git_dir, ignore_errors=True)
+                    if isinstance(e, CloneError):
+                        raise
+                    raise CloneError(f"Failed to update mirror of {url}: {e.stderr.strip()}") from e
+                return Checkout(git_dir, sha)
+        git_dir = self._mkdtemp()
+        logger.info(f"Fetching {url} into {git_dir}")
+        try:
+            repo = git.Repo.init(git_dir, bare=True)
+            repo.create_remote('origin', url)
+        except git.GitCommandError as e:
+            raise CloneError(f"Failed to initialize clone of {url}: {e.stderr.strip()}") from e
+        return Checkout(git_dir, self.fetch_into(repo, rev))
+
+    def checkout(self, url: str, rev: Optional[str] = None) -> Checkout:
+        """Materialize rev (default: the remote HEAD) in a temporary working tree."""
+        url = _normalize_url(url)
+        if self.cache_dir:
+            git_dir, sha = self.fetch(url, rev)
+            work_dir = self._mkdtemp()
+            logger.info(f"Exporting {sha[:12]} of {url} to {work_dir}")
+            self._export(git.Repo(git_dir), sha, work_dir)
+            return Checkout(work_dir, sha)
+
+        work_dir = self._mkdtemp()
+        logger.info(f"Cloning {url} to {work_dir}")
+        try:
+            repo = git.Repo.init(work_dir)
+            repo.create_remote('origin', url)
+            if self.python_only:
+                repo.git.sparse_checkout('set', '--no-cone', '*.py')
+            sha = self.fetch_into(repo, rev, partial=self.python_only)
+            repo.git.checkout('--quiet', sha)
+        except git.GitCommandError as e:
+            raise CloneError(f"Failed to clone {url}: {e.stderr.strip()}") from e
+        return Checkout(work_dir, sha)
+
+    def _export(self, repo: git.Repo, sha: str, work_dir: str):
+        args = ['--format=tar', sha]
+        if self.python_only:
+            args += ['--', PYTHON_PATHSPEC]
+        proc = repo.git.archive(*args, as_process=True)
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode='r|') as archive:
+                if hasattr(tarfile, 'data_filter'):
+                    archive.extractall(work_dir, filter='data')
+                else:
+                    archive.extractall(work_dir)
+        except tarfile.ReadError:
+            # git writes no archive at all when the pathspec matches no files
+            try:
+                proc.wait()
+            except git.GitCommandError:
+                pass
+            return
+        try:
+            proc.wait()
+        except git.GitCommandError as e:
+            raise CloneError(f"Failed to export {sha}: {str(e)}") from e
+
+    def release(self, path: str):
+        """Remove a temporary directory created by this manager; other paths are left alone."""
+        path = os.path.normpath(path)
+        if path in self._temp_dirs:
+            self._temp_dirs.remove(path)
+            shutil.rmtree(path, ignore_errors=True)
+
+    def cleanup(self):
+        """Remove every temporary directory created by this manager."""
+        for path in list(self._temp_dirs):
+            self.release(path)
@@ -0,0 +1,133 @@
+import os
+import re
+import logging
+from fnmatch import fnmatchcase
+from typing import List, Optional, Iterator, Sequence
+
+import git
+
+logger = logging.getLogger(__name__)
+
+# directories that never hold the project's own tests
+PRUNED_DIRS = frozenset({
+    '.git', '.hg', '.svn', '__pycache__', 'node_modules',
+    '.venv', 'venv', 'site-packages', '.tox', '.nox', '.eggs',
+    '.mypy_cache', '.pytest_cache', '.ruff_cache',
+    'build', 'dist', 'vendor', '_vendor', 'third_party',
+})
+
+# a directory counts as a test directory when its name is test/tests/testing or
+# test is a separate word in it (unit_tests, tests-integration), not merely a
+# substring (contest, latest, _pytest)
+_TEST_DIR_RE = re.compile(r'^(tests?|testing|unittests?)$|^tests?[_\-.]|[_\-.]tests?$', re.IGNORECASE)
+
+
+def _matches_any(rel_path: str, patterns: Sequence[str]) -> bool:
+    """Match patterns containing '/' against the relative path and others against the name."""
+    name = rel_path.rsplit('/', 1)[-1]
+    for pattern in patterns:
+        if fnmatchcase(rel_path if '/' in pattern else name, pattern):
+            return True
+    return False
+
+
+class TestFileMatcher:
+    """Decides which relative paths of a repository are test files.
+
+    By default a .py file is a test file when its name contains "test" or one of
+    its directories is a test directory. include globs replace that rule and
+    exclude globs remove files and whole directories. Paths are relative to the
+    repository root and use '/' as separator.
+    """
+
+    def __init__(self, include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+
+    def prune_dir(self, rel_dir: str) -> bool:
+        name = rel_dir.rsplit('/', 1)[-1]
+        if name in PRUNED_DIRS or name.endswith('.egg-info'):
+            return True
+        return bool(self.exclude) and _matches_any(rel_dir, self.exclude)
+
+    def matches(self, rel_path: str) -> bool:
+        if not rel_path.endswith('.py'):
+            return False
+        if self.exclude and _matches_any(rel_path, self.exclude):
+            return False
+        if self.include:
+            return _matches_any(rel_path, self.include)
+        parts = rel_path.split('/')
+        if 'test' in parts[-1].lower():
+            return True
+        return any(_TEST_DIR_RE.search(part) for part in parts[:-1])
+
+    def matches_tracked(self, rel_path: str) -> bool:
+        """Like matches(), but also applies directory pruning to a flat path listing."""
+        parts = rel_path.split('/')
+        for i in range(1, len(parts)):
+            if self.prune_dir('/'.join(parts[:i])):
+                return False
+        return self.matches(rel_path)
+
+
+def list_git_files(directory: str) -> Optional[List[str]]:
+    """List the .py files tracked in the git index of a checkout.
+
+    Returns relative '/'-separated paths, or None when the directory is not a
+    git checkout or git cannot list it. Entries outside a sparse checkout are skipped.
+    """
+    if not os.path.exists(os.path.join(directory, '.git')):
+        return None
+    try:
+        output = git.Repo(directory).git.ls_files('-z', '-t', '--', '*.py')
+    except (git.GitCommandError, git.InvalidGitRepositoryError, git.NoSuchPathError) as e:
+        logger.warning(f"Could not list git index of {directory}: {str(e)}")
+        return None
+    paths = []
+    for entry in output.split('\0'):
+        # entries look like "H path"; S marks skip-worktree (not checked out)
+        if entry and not entry.startswith('S '):
+            paths.append(entry[2:])
+    return paths
+
+
+def _walk(directory: str, matcher: TestFileMatcher) -> Iterator[str]:
+    """Yield matching relative paths from a pruned, sorted os.scandir walk."""
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(directory, rel_dir) if rel_dir else directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Could not list directory {rel_dir or directory}: {str(e)}")
+            continue
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if not matcher.prune_dir(rel_path):
+                    subdirs.append(rel_path)
+            elif matcher.matches(rel_path):
+                yield rel_path
+        # reversed so directories are visited in name order
+        stack.extend(reversed(subdirs))
+
+
+def iter_test_files(directory: str, include: Optional[Sequence[str]] = None,
+                    exclude: Optional[Sequence[str]] = None, use_git: bool = True) -> Iterator[str]:
+    """Yield the absolute paths of test files under directory.
+
+    Tracked files are listed from the git index when the directory is a git
+    checkout; otherwise the tree is walked with vendored, virtualenv, build and
+    VCS directories pruned.
+    """
+    matcher = TestFileMatcher(include, exclude)
+    tracked = list_git_files(directory) if use_git else None
+    if tracked is not None:
+        rel_paths = (path for path in tracked if matcher.matches_tracked(path))
+    else:
+        rel_paths = _walk(directory, matcher)
+    for rel_path in rel_paths:
+        yield os.path.join(directory, *rel_path.split('/'))
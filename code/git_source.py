@@ -0,0 +1,94 @@
+import os
+import logging
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import git
+
+from clone_manager import CloneManager, CloneError
+from discovery import TestFileMatcher
+
+logger = logging.getLogger(__name__)
+
+# tree entry modes that are not regular files (symlinks, submodules)
+_SKIPPED_MODES = ('120000', '160000')
+
+
+class BlobSource(NamedTuple):
+    """A test file read straight from the object database."""
+    path: str
+    blob_sha: str
+    data: bytes
+
+
+def resolve_repo(url_or_path: str, rev: Optional[str], clones: CloneManager) -> Tuple[git.Repo, str]:
+    """Return a repository holding rev and the commit SHA it resolves to.
+
+    A local repository (working tree or bare) is opened in place; anything else
+    is fetched through the clone manager without checking files out.
+    """
+    if os.path.isdir(url_or_path):
+        try:
+            repo = git.Repo(url_or_path)
+            return repo, repo.git.rev_parse(f"{rev or 'HEAD'}^{{commit}}")
+        except git.InvalidGitRepositoryError:
+            pass
+        except git.GitCommandError as e:
+            raise CloneError(f"Unknown revision {rev} in {url_or_path}: {e.stderr.strip()}") from e
+    git_dir, sha = clones.fetch(url_or_path, rev)
+    return git.Repo(git_dir), sha
+
+
+def resolve_rev(repo: git.Repo, rev: str, clones: CloneManager) -> str:
+    """Resolve another revision in a repository returned by resolve_repo, fetching it if needed.
+
+    Only clones made by the clone manager are fetched into; a local repository
+    opened in place is never modified, so a revision it lacks is an error.
+    """
+    try:
+        return repo.git.rev_parse(f"{rev}^{{commit}}")
+    except git.GitCommandError as e:
+        if not clones.manages(repo.git_dir):
+            raise CloneError(f"Unknown revision {rev} in {repo.git_dir}: {e.stderr.strip()}") from e
+    return clones.fetch_into(repo, rev)
+
+
+def commit_time(git_dir: str, sha: str) -> Optional[int]:
+    """Commit timestamp of sha in the repository at git_dir, or None if it cannot be read there."""
+    try:
+        repo = git.Repo(git_dir)
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+        return None
+    try:
+        return repo.commit(sha).committed_date
+    except (ValueError, git.BadName):
+        return None
+    finally:
+        repo.close()
+
+
+def list_tree_files(repo: git.Repo, rev: str, include: Optional[Sequence[str]] = None,
+                    exclude: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+    """List (path, blob SHA) for the test files in the tree of rev."""
+    matcher = TestFileMatcher(include, exclude)
+    output = repo.git.ls_tree('-r', '-z', '--full-tree', rev)
+    files = []
+    for entry in output.split('\0'):
+        if not entry:
+            continue
+        # entries look like "<mode> <type> <sha>\t<path>"
+        meta, path = entry.split('\t', 1)
+        mode, obj_type, sha = meta.split(' ')
+        if obj_type == 'blob' and mode not in _SKIPPED_MODES and matcher.matches_tracked(path):
+            files.append((path, sha))
+    return files
+
+
+def iter_blob_sources(repo: git.Repo, files: Sequence[Tuple[str, str]]) -> Iterator[BlobSource]:
+    """Read the listed blobs from the object database, one at a time."""
+    for path, sha in files:
+        try:
+            data = repo.odb.stream(bytes.fromhex(sha)).read()
+        except (ValueError, git.GitCommandError) as e:
+            logger.warning(f"Could not read blob {sha} for {path}: {str(e)}")
+            continue
+        yield BlobSource(path, sha, data)
@@ -0,0 +1,185 @@
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, Future
+from multiprocessing.connection import wait
+from typing import Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TaskTimeout(Exception):
+    """Raised from a future whose task ran past the pool's time budget; its worker was killed."""
+
+
+class WorkerCrashed(Exception):
+    """Raised from a future whose worker process died while running the task."""
+
+
+def _worker_loop(conn):
+    """Run tasks sent by the pool until told to stop or the pipe closes."""
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args, kwargs = task
+        try:
+            outcome = (True, fn(*args, **kwargs))
+        except BaseException as e:
+            outcome = (False, e)
+        try:
+            conn.send(outcome)
+        except Exception as e:
+            # the result or exception could not be pickled
+            conn.send((False, RuntimeError(f"Could not return task result: {e!r}")))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.future: Optional[Future] = None
+        self.deadline: Optional[float] = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class GuardedPool(Executor):
+    """Process pool whose tasks can be cut off: each task gets at most timeout seconds.
+
+    Workers are long-lived processes fed over pipes. A worker that runs past the
+    budget is killed and replaced, and its future fails with TaskTimeout; one
+    that dies on its own (a crash, the OOM killer) fails its future with
+    WorkerCrashed. Other tasks are unaffected either way. Without a timeout it
+    behaves like a plain process pool.
+    """
+
+    def __init__(self, max_workers: int, timeout: Optional[float] = None, mp_context=None):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._context = mp_context or multiprocessing.get_context()
+        self._pending: Deque[Tuple[Future, object, tuple, dict]] = deque()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._wakeup_reader, self._wakeup_writer = self._context.Pipe(duplex=False)
+        # all workers are started up front so the first tasks do not wait for a fork
+        self._workers: List[_Worker] = [_Worker(self._context) for _ in range(self.max_workers)]
+        self._thread = threading.Thread(target=self._manage, name='guarded-pool', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            self._pending.append((future, fn, args, kwargs))
+        self._wake()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._pending:
+                    self._pending.popleft()[0].cancel()
+        self._wake()
+        if wait:
+            self._thread.join()
+
+    def _wake(self):
+        try:
+            self._wakeup_writer.send_bytes(b'')
+        except OSError:
+            pass
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        replacement = _Worker(self._context)
+        self._workers[self._workers.index(worker)] = replacement
+        return replacement
+
+    def _dispatch(self):
+        for worker in self._workers:
+            if worker.future is not None:
+                continue
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        return
+                    future, fn, args, kwargs = self._pending.popleft()
+                if future.set_running_or_notify_cancel():
+                    break
+            try:
+                try:
+                    worker.conn.send((fn, args, kwargs))
+                except OSError:
+                    # the idle worker is gone; retry once on a fresh one
+                    worker = self._replace(worker)
+                    worker.conn.send((fn, args, kwargs))
+            except Exception as e:
+                # pickling fails before anything is written, so the worker stays usable
+                future.set_exception(e)
+                continue
+            worker.future = future
+            worker.deadline = time.monotonic() + self.timeout if self.timeout else None
+
+    def _finish(self, worker: _Worker):
+        future = worker.future
+        worker.future = worker.deadline = None
+        try:
+            ok, value = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.process.join()
+            future.set_exception(WorkerCrashed(f"Worker exited with code {worker.process.exitcode}"))
+            self._replace(worker)
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _manage(self):
+        while True:
+            self._dispatch()
+            busy = [worker for worker in self._workers if worker.future is not None]
+            with self._lock:
+                if self._shutdown and not self._pending and not busy:
+                    break
+            deadlines = [worker.deadline for worker in busy if worker.deadline is not None]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            ready = wait([worker.conn for worker in busy] + [self._wakeup_reader], timeout)
+            if self._wakeup_reader in ready:
+                while self._wakeup_reader.poll():
+                    self._wakeup_reader.recv_bytes()
+            for worker in busy:
+                if worker.conn in ready:
+                    self._finish(worker)
+                elif worker.deadline is not None and worker.deadline <= time.monotonic():
+                    logger.warning(f"Killing worker {worker.process.pid} after {self.timeout}s")
+                    worker.kill()
+                    worker.future.set_exception(TaskTimeout(f"Task exceeded the {self.timeout}s time budget"))
+                    self._replace(worker)
+        for worker in self._workers:
+            worker.stop()
+        self._wakeup_reader.close()
+        self._wakeup_writer.close()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+import os
+import csv
+import sys
+import logging
+import argparse
+from collections import Counter
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import git
+
+from assertion_extractor import iter_analyze_files, extract_repo_name, EXTRACTOR_VERSION, DEFAULT_CHUNK_SIZE
+from clone_manager import CloneManager, CloneError
+from git_source import BlobSource, resolve_repo, list_tree_files, iter_blob_sources
+from records import AssertionTable
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_FIELDS = ['sha', 'label', 'committed_at', 'files', 'tests', 'assertions']
+SERIES_FIELDS = ['sha', 'label', 'committed_at', 'filepath', 'blob_sha', 'tests', 'assertions']
+
+
+class HistoryCommit(NamedTuple):
+    sha: str
+    label: str
+    committed_at: int
+
+
+class BlobStats(NamedTuple):
+    """What the timeline needs from one analyzed blob; the same for every path and commit holding it."""
+    assertions: int
+    tests: int
+    categories: Counter
+
+
+class HistoryPoint(NamedTuple):
+    commit: HistoryCommit
+    files: int
+    tests: int
+    assertions: int
+    categories: Counter
+
+
+class History(NamedTuple):
+    points: List[HistoryPoint]
+    # commit SHA -> (path, blob SHA) of each of its test files
+    trees: Dict[str, List[Tuple[str, str]]]
+    blobs: Dict[str, BlobStats]
+
+
+def blob_stats(table: AssertionTable) -> BlobStats:
+    return BlobStats(
+        assertions=len(table),
+        tests=len(set(zip(table.class_codes, table.test_codes))),
+        categories=Counter(table.categories[code] for code in table.category_codes),
+    )
+
+
+def tag_commits(repo: git.Repo, pattern: Optional[str] = None) -> List[HistoryCommit]:
+    """Commits pointed to by tags, oldest first; a commit with several tags is listed once."""
+    args = ['--sort=creatordate',
+            '--format=%(refname:short)%00%(objecttype)%00%(objectname)%00%(*objecttype)%00%(*objectname)']
+    args.append(f'refs/tags/{pattern}' if pattern else 'refs/tags')
+    labels: Dict[str, List[str]] = {}
+    for line in repo.git.for_each_ref(*args).splitlines():
+        name, obj_type, sha, peeled_type, peeled_sha = line.split('\0')
+        # annotated tags point at a tag object; the * fields describe the object behind it
+        if peeled_type:
+            obj_type, sha = peeled_type, peeled_sha
+        if obj_type != 'commit':
+            continue
+        labels.setdefault(sha, []).append(name)
+    return [HistoryCommit(sha, ' '.join(names), repo.commit(sha).committed_date) for sha, names in labels.items()]
+
+
+def range_commits(repo: git.Repo, rev_range: str = 'HEAD', every: int = 1,
+                  first_parent: bool = True) -> List[HistoryCommit]:
+    """Every Nth commit of rev_range, oldest first, always ending with its newest commit."""
+    args = ['--reverse', '--format=%H %ct']
+    if first_parent:
+        args.append('--first-parent')
+    entries = [line.split(' ') for line in repo.git.log(*args, rev_range).splitlines()]
+    if not entries:
+        return []
+    picked = entries[::max(1, every)]
+    if picked[-1] is not entries[-1]:
+        picked.append(entries[-1])
+    return [HistoryCommit(sha, '', int(timestamp)) for sha, timestamp in picked]
+
+
+def build_history(repo: git.Repo, commits: Sequence[HistoryCommit],
+                  include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None,
+                  workers: Optional[int] = None, chunksize: int = DEFAULT_CHUNK_SIZE,
+                  cache: Optional[ResultCache] = None) -> History:
+    """Count the assertions of every commit, analyzing each distinct test file blob once.
+
+    Listing a tree is cheap, so all selected trees are read first; the blobs
+    they share are then parsed once, on a process pool when workers > 1, and
+    every commit's totals are summed from the per-blob results.
+    """
+    trees = {}
+    unique: Dict[str, str] = {}
+    for commit in commits:
+        files = list_tree_files(repo, commit.sha, include, exclude)
+        trees[commit.sha] = files
+        for path, blob_sha in files:
+            unique.setdefault(blob_sha, path)
+    total_files = sum(len(files) for files in trees.values())
+    logger.info(f"{len(commits)} commits hold {total_files} test files but only {len(unique)} distinct blobs")
+
+    blobs: Dict[str, BlobStats] = {}
+    sources = iter_blob_sources(repo, [(path, blob_sha) for blob_sha, path in unique.items()])
+    # unreadable blobs are skipped by iter_blob_sources, so record which ones actually went in;
+    # results come back in input order
+    analyzed: List[str] = []
+
+    def tracked(items: Iterator[BlobSource]) -> Iterator[BlobSource]:
+        for source in items:
+            analyzed.append(source.blob_sha)
+            yield source
+
+    for index, table in enumerate(iter_analyze_files(tracked(sources), workers=workers, chunksize=chunksize,
+                                                     cache=cache)):
+        blobs[analyzed[index]] = blob_stats(table)
+
+    points = []
+    empty = BlobStats(0, 0, Counter())
+    for commit in commits:
+        # blobs that could not be read count as empty files
+        stats = [blobs.get(blob_sha, empty) for _, blob_sha in trees[commit.sha]]
+        categories = Counter()
+        for blob in stats:
+            categories.update(blob.categories)
+        points.append(HistoryPoint(commit, len(stats), sum(blob.tests for blob in stats),
+                                   sum(blob.assertions for blob in stats), categories))
+    return History(points, trees, blobs)
+
+
+def write_timeline(history: History, output_file: str):
+    """One row per commit with its totals and a column per assertion category."""
+    categories = sorted({category for point in history.points for category in point.categories})
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(TIMELINE_FIELDS + categories)
+        for point in history.points:
+            commit = point.commit
+            writer.writerow([commit.sha, commit.label, commit.committed_at, point.files, point.tests,
+                             point.assertions] + [point.categories[category] for category in categories])
+
+
+def write_series(history: History, output_file: str):
+    """One row per test file per commit, so each path's counts can be followed over time."""
+    empty = BlobStats(0, 0, Counter())
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SERIES_FIELDS)
+        for point in history.points:
+            commit = point.commit
+            for path, blob_sha in history.trees[commit.sha]:
+                blob = history.blobs.get(blob_sha, empty)
+                writer.writerow([commit.sha, commit.label, commit.committed_at, path, blob_sha,
+                                 blob.tests, blob.assertions])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Track assertion counts across a repository's history")
+    parser.add_argument("github_url", help="URL or local path of the repository")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--tags", nargs='?', const='', default=None, metavar="PATTERN",
+                           help="analyze every tagged commit, optionally only tags matching PATTERN (e.g. 'v*')")
+    selection.add_argument("--range", default="HEAD", dest="rev_range",
+                           help="revision range to walk, e.g. main or v1.0..main; branches of a remote "
+                                "repository are named origin/<branch> (default: HEAD)")
+    parser.add_argument("--every", type=int, default=1, help="analyze every Nth commit of the range")
+    parser.add_argument("--all-parents", action="store_true",
+                        help="also walk commits of merged branches instead of only the first-parent chain")
+    parser.add_argument("--timeline", default=None, help="per-commit totals (default: <repo>_timeline.csv)")
+    parser.add_argument("--series", default=None, help="per-file counts (default: <repo>_series.csv)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--cache-dir", default=None, help="directory of the per-file result cache")
+    parser.add_argument("--clone-cache", default=None, metavar="DIR", help="directory of cached mirrors")
+    parser.add_argument("--include", action="append", default=None, metavar="GLOB")
+    parser.add_argument("--exclude", action="append", default=None, metavar="GLOB")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    repo_name = extract_repo_name(args.github_url)
+    timeline_file = args.timeline or f"{repo_name}_timeline.csv"
+    series_file = args.series or f"{repo_name}_series.csv"
+    cache = ResultCache(args.cache_dir, EXTRACTOR_VERSION) if args.cache_dir else None
+
+    # walking history needs every commit, so remote repositories are fetched in full
+    with CloneManager(args.clone_cache, depth=0) as clones:
+        try:
+            repo, head_sha = resolve_repo(args.github_url, None, clones)
+            rev_range = args.rev_range
+            if not os.path.isdir(args.github_url):
+                # a fetched repository has no HEAD or branches of its own: fetch the
+                # remote's branches so named ranges resolve and walk the fetched HEAD by SHA
+                if args.tags is not None:
+                    repo.git.fetch('origin', '+refs/tags/*:refs/tags/*')
+                else:
+                    repo.git.fetch('origin', '+refs/heads/*:refs/remotes/origin/*')
+                if rev_range == 'HEAD':
+                    rev_range = head_sha
+            if args.tags is not None:
+                commits = tag_commits(repo, args.tags or None)
+            else:
+                commits = range_commits(repo, rev_range, args.every, not args.all_parents)
+        except (CloneError, git.GitCommandError) as e:
+            logger.error(f"Failed to list commits: {str(e)}")
+            sys.exit(1)
+        if not commits:
+            logger.error("No commits selected")
+            sys.exit(1)
+        history = build_history(repo, commits, args.include, args.exclude, workers=args.workers,
+                                chunksize=args.chunk_size, cache=cache)
+        repo.close()
+
+    if cache is not None:
+        cache.close()
+
+    write_timeline(history, timeline_file)
+    write_series(history, series_file)
+    first, last = history.points[0], history.points[-1]
+    logger.info(f"Analyzed {len(history.blobs)} distinct blobs for {len(history.points)} commits")
+    logger.info(f"Assertions went from {first.assertions} at {first.commit.sha[:12]} "
+                f"to {last.assertions} at {last.commit.sha[:12]}")
+    logger.info(f"Results written to {timeline_file} and {series_file}")
+
+
+if __name__ == "__main__":
+    main()
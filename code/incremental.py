@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import sys
+import logging
+import argparse
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import git
+
+from assertion_extractor import (
+    iter_analyze_files, read_assertions, AssertionWriter, extract_repo_name,
+    EXTRACTOR_VERSION, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_FILE_MB, OUTPUT_FORMATS
+)
+from clone_manager import CloneManager, CloneError
+from discovery import TestFileMatcher
+from records import AssertionTable
+from git_source import resolve_repo, resolve_rev, list_tree_files, iter_blob_sources
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+class FileChange(NamedTuple):
+    status: str
+    path: str
+    blob_sha: str
+
+
+class IncrementalResult(NamedTuple):
+    merged: AssertionTable
+    added: List[Dict]
+    removed: List[Dict]
+    changes: List[FileChange]
+
+
+def diff_test_files(repo: git.Repo, old_sha: str, new_sha: str,
+                    include: Optional[Sequence[str]] = None,
+                    exclude: Optional[Sequence[str]] = None) -> List[FileChange]:
+    """List test files added (A), modified (M, T) or deleted (D) between two commits.
+
+    Renames are reported as a deletion plus an addition. blob_sha is the new
+    content, or the old one for deletions.
+    """
+    matcher = TestFileMatcher(include, exclude)
+    output = repo.git.diff('--raw', '-z', '--no-renames', '--no-abbrev', old_sha, new_sha)
+    fields = output.split('\0')
+    changes = []
+    # entries come in pairs: ":<old mode> <new mode> <old sha> <new sha> <status>", "<path>"
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        if not meta.startswith(':'):
+            continue
+        _, _, old_blob, new_blob, status = meta[1:].split(' ')
+        if not matcher.matches_tracked(path):
+            continue
+        changes.append(FileChange(status, path, old_blob if status == 'D' else new_blob))
+    return changes
+
+
+def _row_key(row: Dict):
+    # line numbers shift whenever code above an assertion changes, so they are
+    # not part of an assertion's identity when computing the delta
+    return row['filepath'], row['testclass'], row['testname'], row['assert_string']
+
+
+def _multiset_difference(rows: Iterable[Dict], other: Iterable[Dict]) -> List[Dict]:
+    remaining = Counter(_row_key(row) for row in other)
+    result = []
+    for row in rows:
+        key = _row_key(row)
+        if remaining[key]:
+            remaining[key] -= 1
+        else:
+            result.append(row)
+    return result
+
+
+def incremental_extract(repo: git.Repo, old_sha: str, new_sha: str, previous: Iterable[Dict],
+                        include: Optional[Sequence[str]] = None,
+                        exclude: Optional[Sequence[str]] = None,
+                        workers: Optional[int] = None, chunksize: int = DEFAULT_CHUNK_SIZE,
+                        cache: Optional[ResultCache] = None,
+                        max_bytes: Optional[int] = None) -> IncrementalResult:
+    """Update a previous result set for old_sha to new_sha, re-analyzing only changed test files.
+
+    previous must use paths relative to the repository root, as written by a
+    --rev run; ValueError is raised if none of its paths are test files at
+    old_sha. The merged rows come out in the same order a full run at new_sha
+    would produce; pass the same max_bytes as that run so changed files over
+    the limit are skipped alike.
+    """
+    changes = diff_test_files(repo, old_sha, new_sha, include, exclude)
+    changed_paths = {change.path for change in changes}
+    logger.info(f"{len(changes)} test files changed between {old_sha[:12]} and {new_sha[:12]}")
+
+    previous_by_file: Dict[str, List[Dict]] = {}
+    for row in previous:
+        previous_by_file.setdefault(row['filepath'], []).append(row)
+    # rows from a checkout run carry absolute temporary paths, which would silently drop every unchanged file
+    old_paths = {path for path, _ in list_tree_files(repo, old_sha, include, exclude)}
+    if previous_by_file and old_paths.isdisjoint(previous_by_file):
+        raise ValueError(f"None of the previous file paths (e.g. {next(iter(previous_by_file))}) are test files "
+                         f"at {old_sha[:12]}; the previous results must come from a --rev run of that revision")
+
+    # only the changed files are read, so holding their blobs is cheap
+    sources = list(iter_blob_sources(repo, [
+        (change.path, change.blob_sha) for change in changes if change.status != 'D'
+    ]))
+    new_by_file: Dict[str, AssertionTable] = {}
+    for source, file_assertions in zip(sources, iter_analyze_files(
+            sources, workers=workers, chunksize=chunksize, cache=cache, max_bytes=max_bytes)):
+        new_by_file[source.path] = file_assertions
+
+    merged = AssertionTable()
+    for path, _ in list_tree_files(repo, new_sha, include, exclude):
+        if path in changed_paths:
+            merged.extend(new_by_file.get(path, []))
+        else:
+            merged.extend(previous_by_file.get(path, []))
+
+    added, removed = [], []
+    for path in sorted(changed_paths):
+        old_rows = previous_by_file.get(path, [])
+        new_rows = new_by_file.get(path, [])
+        added.extend(_multiset_difference(new_rows, old_rows))
+        removed.extend(_multiset_difference(old_rows, new_rows))
+    return IncrementalResult(merged, added, removed, changes)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-extract assertions incrementally between two revisions")
+    parser.add_argument("github_url", help="URL or local path of the repository")
+    parser.add_argument("--previous", required=True,
+                        help="result file (CSV or JSONL) produced for the old revision with --rev")
+    parser.add_argument("--old", required=True, help="revision the previous results were extracted at")
+    parser.add_argument("--new", default="HEAD", help="revision to update the results to")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument("--output", default=None, help="merged result file (default: <repo>_assertions.<format>)")
+    parser.add_argument("--delta", default=None, help="delta file (default: <repo>_delta.<format>)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--cache-dir", default=None, help="directory of the per-file result cache")
+    parser.add_argument("--clone-cache", default=None, metavar="DIR", help="directory of cached mirrors")
+    parser.add_argument("--include", action="append", default=None, metavar="GLOB")
+    parser.add_argument("--exclude", action="append", default=None, metavar="GLOB")
+    parser.add_argument("--max-file-size", type=float, default=DEFAULT_MAX_FILE_MB, metavar="MB",
+                        help="skip test files larger than this (0 = no limit); use the same limit as the previous run")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    repo_name = extract_repo_name(args.github_url)
+    output_file = args.output or f"{repo_name}_assertions.{args.format}"
+    delta_file = args.delta or f"{repo_name}_delta.{args.format}"
+    cache = ResultCache(args.cache_dir, EXTRACTOR_VERSION) if args.cache_dir else None
+    max_bytes = int(args.max_file_size * 1024 * 1024) if args.max_file_size > 0 else None
+
+    with CloneManager(args.clone_cache) as clones:
+        try:
+            repo, new_sha = resolve_repo(args.github_url, args.new, clones)
+            old_sha = resolve_rev(repo, args.old, clones)
+        except CloneError as e:
+            logger.error(f"Failed to fetch revisions: {str(e)}")
+            sys.exit(1)
+        try:
+            result = incremental_extract(repo, old_sha, new_sha, read_assertions(args.previous),
+                                         args.include, args.exclude, workers=args.workers,
+                                         chunksize=args.chunk_size, cache=cache, max_bytes=max_bytes)
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        finally:
+            repo.close()
+
+    if cache is not None:
+        cache.close()
+
+    with AssertionWriter(output_file, args.format) as writer:
+        writer.write(result.merged)
+    with AssertionWriter(delta_file, args.format, extra_fields=('change',)) as writer:
+        writer.write(dict(row, change='added') for row in result.added)
+        writer.write(dict(row, change='removed') for row in result.removed)
+
+    logger.info(f"Re-analyzed {sum(c.status != 'D' for c in result.changes)} files, "
+                f"dropped {sum(c.status == 'D' for c in result.changes)} deleted files")
+    logger.info(f"{len(result.added)} assertions added, {len(result.removed)} removed, "
+                f"{len(result.merged)} in total")
+    logger.info(f"Results written to {output_file} and {delta_file}")
+
+
+if __name__ == "__main__":
+    main()
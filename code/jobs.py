@@ -0,0 +1,188 @@
+import time
+import hashlib
+import contextlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from assertion_extractor import get_test_files, iter_analyze_files
+from clone_manager import CloneManager
+from profiling import Profiler
+from records import AssertionTable, AssertionSummary
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when a new job is submitted while too many jobs are already waiting or running."""
+
+
+class ExtractionJob:
+    """Extraction of one repository at a fixed commit, run on a background thread.
+
+    state moves through queued, cloning, discovering and analyzing and ends as
+    done or failed. Progress fields are written by the worker thread and may be
+    read at any time from other threads. Rows are appended to assertions as each file completes,
+    so readers may consume the first len(assertions) rows while the job runs;
+    summary, error and profile are final once done() is true. Files are analyzed
+    on executor when one is given (e.g. a long-lived pool), otherwise on a pool
+    created for the job; files over max_bytes are skipped and listed in
+    assertions.skipped.
+    """
+
+    def __init__(self, url: str, sha: str, profile: bool = False, executor: Optional[Executor] = None,
+                 clone_cache: Optional[str] = None, cache: Optional[ResultCache] = None,
+                 max_bytes: Optional[int] = None):
+        self.url = url
+        self.sha = sha
+        self.state = 'queued'
+        self.files_done = 0
+        self.files_total: Optional[int] = None
+        self.assertions = AssertionTable()
+        self.summary: Optional[AssertionSummary] = None
+        self.error: Optional[str] = None
+        self.profile: Optional[Dict] = None
+        self.submitted = time.time()
+        self.finished: Optional[float] = None
+        self._profile = profile
+        self._executor = executor
+        self._clone_cache = clone_cache
+        self._cache = cache
+        self._max_bytes = max_bytes
+        self._done = threading.Event()
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.url, self.sha
+
+    @property
+    def id(self) -> str:
+        return job_id(self.url, self.sha)
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def progress(self) -> float:
+        """Rough completion between 0 and 1: cloning and discovery take the first half."""
+        if self.state == 'done':
+            return 1.0
+        if self.state == 'analyzing' and self.files_total:
+            return 0.5 + 0.5 * self.files_done / self.files_total
+        return {'cloning': 0.1, 'discovering': 0.25, 'analyzing': 0.5}.get(self.state, 0.0)
+
+    def _update_progress(self, done: int, total: Optional[int]):
+        self.files_done = done
+
+    def run(self):
+        profiler = Profiler() if self._profile else None
+        
+        def stage(name):
+            return profiler.stage(name) if profiler else contextlib.nullcontext()
+        
+        try:
+            with CloneManager(self._clone_cache) as clones:
+                self.state = 'cloning'
+                with stage('clone'):
+                    repo_dir = clones.checkout(self.url, self.sha).path
+                self.state = 'discovering'
+                with stage('discover'):
+                    test_files = get_test_files(repo_dir)
+                self.files_total = len(test_files)
+                self.state = 'analyzing'
+                with stage('analyze'):
+                    for file_assertions in iter_analyze_files(test_files, progress_callback=self._update_progress,
+                                                              cache=self._cache, executor=self._executor,
+                                                              profiler=profiler, max_bytes=self._max_bytes):
+                        self.assertions.extend(file_assertions)
+            self.summary = self.assertions.summarize()
+            if profiler:
+                self.profile = profiler.report()
+            self.state = 'done'
+        except Exception as e:
+            logger.error(f"Extraction of {self.url} at {self.sha[:12]} failed: {str(e)}")
+            self.error = str(e)
+            self.state = 'failed'
+        finally:
+            self.finished = time.time()
+            self._done.set()
+
+
+def job_id(url: str, sha: str) -> str:
+    """Stable identifier of the extraction of url at commit sha."""
+    return hashlib.sha1(f"{url}@{sha}".encode('utf-8')).hexdigest()[:16]
+
+
+class JobCache:
+    """Runs extraction jobs on a small thread pool and memoizes them by (url, commit SHA).
+
+    Asking for a repository at a commit that is already queued, running or
+    finished returns the existing job, so identical requests share one
+    extraction. At most max_running jobs run at once and, when max_queued is
+    set, submitting while that many jobs are unfinished raises JobQueueFull. At
+    most max_entries finished jobs are kept, least recently used first out;
+    failed jobs are retried on the next request. executor, clone_cache, cache
+    and max_bytes are handed to every job.
+    """
+
+    def __init__(self, max_entries: int = 8, max_running: int = 2, max_queued: Optional[int] = None,
+                 executor: Optional[Executor] = None, clone_cache: Optional[str] = None,
+                 cache: Optional[ResultCache] = None, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_queued = max_queued
+        self.executor = executor
+        self.clone_cache = clone_cache
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self._jobs: 'OrderedDict[Tuple[str, str], ExtractionJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._runner = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix='extract')
+
+    def get(self, url: str, sha: str) -> Optional[ExtractionJob]:
+        with self._lock:
+            job = self._jobs.get((url, sha))
+            if job is not None:
+                self._jobs.move_to_end(job.key)
+            return job
+
+    def find(self, job_id: str) -> Optional[ExtractionJob]:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.id == job_id:
+                    return job
+        return None
+
+    def jobs(self) -> List[ExtractionJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def submit(self, url: str, sha: str, profile: bool = False) -> ExtractionJob:
+        with self._lock:
+            job = self._jobs.get((url, sha))
+            # a finished job is rerun if it failed, or if a profile is wanted and it has none
+            rerun = job is not None and job.done() and (job.state == 'failed' or (profile and job.profile is None))
+            if job is not None and not rerun:
+                self._jobs.move_to_end(job.key)
+                return job
+            if self.max_queued is not None and sum(not j.done() for j in self._jobs.values()) >= self.max_queued:
+                raise JobQueueFull(f"{self.max_queued} jobs are already queued or running")
+            job = ExtractionJob(url, sha, profile, self.executor, self.clone_cache, self.cache, self.max_bytes)
+            self._jobs[job.key] = job
+            self._jobs.move_to_end(job.key)
+            self._runner.submit(job.run)
+            self._evict()
+            return job
+
+    def _evict(self):
+        finished = [key for key, job in self._jobs.items() if job.done()]
+        # running jobs are never evicted, so the cache can briefly exceed max_entries
+        for key in finished[:max(0, len(self._jobs) - self.max_entries)]:
+            del self._jobs[key]
+
+    def shutdown(self, wait: bool = False):
+        self._runner.shutdown(wait=wait)
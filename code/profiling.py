@@ -0,0 +1,139 @@
+import sys
+import json
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# order in which stages are listed in reports
+STAGE_ORDER = ['clone', 'discover', 'read', 'parse', 'visit', 'write', 'analyze']
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None if it cannot be determined."""
+    try:
+        with open('/proc/self/status', 'rb') as f:
+            for line in f:
+                if line.startswith(b'VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def reset_peak_rss() -> bool:
+    """Reset the peak RSS counter to the current RSS; only supported on Linux."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return None if value is None else round(value / (1024 * 1024), 1)
+
+
+class Profiler:
+    """Collects wall time and peak memory per pipeline stage plus per-file costs.
+
+    Contiguous stages (clone, the whole analysis) are measured with stage(),
+    which resets the peak RSS counter where the platform allows it. Stages that
+    interleave while streaming (discover, write) accumulate time across calls.
+    read, parse and visit are summed from the per-file timings reported by the
+    analysis workers, with the peak RSS of those workers.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+        self.files: List[Dict] = []
+
+    def _entry(self, name: str) -> Dict:
+        return self.stages.setdefault(name, {'wall_seconds': 0.0, 'calls': 0, 'peak_rss_bytes': None})
+
+    def add(self, name: str, seconds: float, peak_rss: Optional[int] = None):
+        entry = self._entry(name)
+        entry['wall_seconds'] += seconds
+        entry['calls'] += 1
+        if peak_rss is not None:
+            entry['peak_rss_bytes'] = max(entry['peak_rss_bytes'] or 0, peak_rss)
+
+    @contextmanager
+    def stage(self, name: str, track_memory: bool = True):
+        if track_memory:
+            reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, peak_rss_bytes() if track_memory else None)
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Wrap an iterator, charging the time spent producing each item to a stage."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start)
+                return
+            self.add(name, time.perf_counter() - start)
+            yield item
+
+    def record_file(self, filepath: str, timings: Dict, peak_rss: Optional[int] = None):
+        """Record the per-file timings filled in by analyze_file()/analyze_source()."""
+        for name in ('read', 'parse', 'visit'):
+            if name in timings:
+                self.add(name, timings[name], peak_rss)
+        self.files.append(dict(timings, filepath=filepath))
+
+    def report(self, top_n: int = 20) -> Dict:
+        stages = {}
+        for name in sorted(self.stages, key=lambda n: STAGE_ORDER.index(n) if n in STAGE_ORDER else len(STAGE_ORDER)):
+            entry = self.stages[name]
+            stages[name] = {
+                'wall_seconds': round(entry['wall_seconds'], 4),
+                'calls': entry['calls'],
+                'peak_rss_mb': _mb(entry['peak_rss_bytes']),
+            }
+        for timings in self.files:
+            timings['total'] = sum(timings.get(name, 0.0) for name in ('read', 'parse', 'visit'))
+        slowest = sorted(self.files, key=lambda t: t['total'], reverse=True)[:top_n]
+        return {
+            'stages': stages,
+            'files': {
+                'count': len(self.files),
+                'cached': sum(1 for t in self.files if t.get('cached')),
+                'bytes': sum(t.get('bytes', 0) for t in self.files),
+                'slowest': [
+                    {
+                        'filepath': t['filepath'],
+                        'bytes': t.get('bytes', 0),
+                        'read_seconds': round(t.get('read', 0.0), 6),
+                        'parse_seconds': round(t.get('parse', 0.0), 6),
+                        'visit_seconds': round(t.get('visit', 0.0), 6),
+                        'total_seconds': round(t['total'], 6),
+                        'cached': bool(t.get('cached')),
+                    }
+                    for t in slowest
+                ],
+            },
+        }
+
+    def write_report(self, output_file: str, top_n: int = 20):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.report(top_n), f, indent=2)
+        logger.info(f"Profile written to {output_file}")
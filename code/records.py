@@ -0,0 +1,270 @@
+import os
+import itertools
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+ROW_KEYS = ('filepath', 'testclass', 'testname', 'line_number', 'assert_string')
+
+# category and method of assertions read back from files, which do not record them
+UNKNOWN_CATEGORY = 'Other'
+UNKNOWN_METHOD = 'other'
+
+Row = Tuple[str, str, str, int, str]
+# (testclass, testname, line_number, assert_string, category, method), as kept in the result cache
+CacheRow = Tuple[str, str, int, str, str, str]
+
+
+class SkippedFile(NamedTuple):
+    """A file whose assertions are missing from the results, and why.
+
+    reason is one of too_large, timeout, crashed, recursion, memory,
+    syntax_error, unreadable or error.
+    """
+    filepath: str
+    reason: str
+    detail: str
+
+
+def _encode(values: List[str], index: Dict[str, int], value: str) -> int:
+    code = index.get(value)
+    if code is None:
+        code = index[value] = len(values)
+        values.append(value)
+    return code
+
+
+def directory_label(filepath: str) -> str:
+    """Name of the directory holding filepath, or 'root' for a top-level file."""
+    return os.path.dirname(filepath).split('/')[-1] if '/' in filepath else 'root'
+
+
+class AssertionSummary(NamedTuple):
+    """Assertion counts per file, class, test name, category and directory.
+
+    file_tests and file_classes hold the number of distinct test functions and
+    non-empty test classes per file. by_class leaves out module-level tests.
+    """
+    total: int
+    by_file: Counter
+    by_class: Counter
+    by_test: Counter
+    by_category: Counter
+    by_directory: Counter
+    file_tests: Counter
+    file_classes: Counter
+
+
+class AssertionTable:
+    """Column-oriented container of assertion rows.
+
+    filepath, testclass, testname, the assertion category and the assertion
+    method ("assert", "pytest.raises" or the called method's name) are
+    dictionary-encoded: each distinct string is stored once and rows hold
+    integer codes into it, and line numbers live in a compact integer array.
+    The directory label and basename are derived, and encoded the same way,
+    once per distinct path.
+    Iterating yields the usual row dicts, built on demand, so code written
+    against lists of dicts keeps working; bulk consumers should use
+    iter_tuples(), to_dataframe() or summarize() instead. Files that could not
+    be analyzed are listed in skipped and travel with the rows.
+    """
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.classes: List[str] = []
+        self.tests: List[str] = []
+        self.categories: List[str] = []
+        self.methods: List[str] = []
+        self.path_codes = array('I')
+        self.class_codes = array('I')
+        self.test_codes = array('I')
+        self.category_codes = array('I')
+        self.method_codes = array('I')
+        self.line_numbers = array('I')
+        self.assert_strings: List[str] = []
+        # per distinct path, indexed by path code
+        self.basenames: List[str] = []
+        self.directories: List[str] = []
+        self.path_basename_codes = array('I')
+        self.path_directory_codes = array('I')
+        self.skipped: List[SkippedFile] = []
+        self._build_indexes()
+
+    def _build_indexes(self):
+        self._path_index = {value: code for code, value in enumerate(self.paths)}
+        self._class_index = {value: code for code, value in enumerate(self.classes)}
+        self._test_index = {value: code for code, value in enumerate(self.tests)}
+        self._category_index = {value: code for code, value in enumerate(self.categories)}
+        self._method_index = {value: code for code, value in enumerate(self.methods)}
+        self._basename_index = {value: code for code, value in enumerate(self.basenames)}
+        self._directory_index = {value: code for code, value in enumerate(self.directories)}
+
+    def __getstate__(self):
+        # the lookup indexes are derived from the dictionaries; rebuild rather than pickle them
+        state = self.__dict__.copy()
+        for key in ('_path_index', '_class_index', '_test_index', '_category_index', '_method_index',
+                    '_basename_index', '_directory_index'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_indexes()
+
+    def _path_code(self, filepath: str) -> int:
+        code = self._path_index.get(filepath)
+        if code is None:
+            code = self._path_index[filepath] = len(self.paths)
+            self.paths.append(filepath)
+            self.path_basename_codes.append(
+                _encode(self.basenames, self._basename_index, os.path.basename(filepath)))
+            self.path_directory_codes.append(
+                _encode(self.directories, self._directory_index, directory_label(filepath)))
+        return code
+
+    def append(self, filepath: str, testclass: str, testname: str, line_number: int, assert_string: str,
+               category: str = UNKNOWN_CATEGORY, method: str = UNKNOWN_METHOD):
+        self.path_codes.append(self._path_code(filepath))
+        self.class_codes.append(_encode(self.classes, self._class_index, testclass))
+        self.test_codes.append(_encode(self.tests, self._test_index, testname))
+        self.category_codes.append(_encode(self.categories, self._category_index, category))
+        self.method_codes.append(_encode(self.methods, self._method_index, method))
+        self.line_numbers.append(line_number)
+        self.assert_strings.append(assert_string)
+
+    def skip(self, filepath: str, reason: str, detail: str = ''):
+        self.skipped.append(SkippedFile(filepath, reason, detail))
+
+    def extend_file(self, filepath: str, rows: Iterable[CacheRow]):
+        """Append (testclass, testname, line_number, assert_string, category, method) rows that all belong to filepath."""
+        path_code = self._path_code(filepath)
+        for testclass, testname, line_number, assert_string, category, method in rows:
+            self.path_codes.append(path_code)
+            self.class_codes.append(_encode(self.classes, self._class_index, testclass))
+            self.test_codes.append(_encode(self.tests, self._test_index, testname))
+            self.category_codes.append(_encode(self.categories, self._category_index, category))
+            self.method_codes.append(_encode(self.methods, self._method_index, method))
+            self.line_numbers.append(line_number)
+            self.assert_strings.append(assert_string)
+
+    def extend(self, rows: Union['AssertionTable', Iterable[Dict]]):
+        """Append another table, remapping its codes and taking over its skipped files, or any iterable of row dicts."""
+        if not isinstance(rows, AssertionTable):
+            for row in rows:
+                self.append(row['filepath'], row['testclass'], row['testname'],
+                            row['line_number'], row['assert_string'], row.get('category', UNKNOWN_CATEGORY),
+                            row.get('method', UNKNOWN_METHOD))
+            return
+        path_map = [self._path_code(value) for value in rows.paths]
+        class_map = [_encode(self.classes, self._class_index, value) for value in rows.classes]
+        test_map = [_encode(self.tests, self._test_index, value) for value in rows.tests]
+        category_map = [_encode(self.categories, self._category_index, value) for value in rows.categories]
+        method_map = [_encode(self.methods, self._method_index, value) for value in rows.methods]
+        self.path_codes.extend(path_map[code] for code in rows.path_codes)
+        self.class_codes.extend(class_map[code] for code in rows.class_codes)
+        self.test_codes.extend(test_map[code] for code in rows.test_codes)
+        self.category_codes.extend(category_map[code] for code in rows.category_codes)
+        self.method_codes.extend(method_map[code] for code in rows.method_codes)
+        self.line_numbers.extend(rows.line_numbers)
+        self.assert_strings.extend(rows.assert_strings)
+        self.skipped.extend(rows.skipped)
+
+    def __len__(self) -> int:
+        return len(self.assert_strings)
+
+    def __getitem__(self, index: int) -> Dict:
+        return dict(zip(ROW_KEYS, self._row(index)))
+
+    def _row(self, index: int) -> Row:
+        return (
+            self.paths[self.path_codes[index]],
+            self.classes[self.class_codes[index]],
+            self.tests[self.test_codes[index]],
+            self.line_numbers[index],
+            self.assert_strings[index],
+        )
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in self.iter_tuples():
+            yield dict(zip(ROW_KEYS, row))
+
+    def __repr__(self) -> str:
+        return f"<AssertionTable {len(self)} rows, {len(self.paths)} files>"
+
+    def iter_tuples(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Row]:
+        """Rows start..stop as tuples in ROW_KEYS order, without building dicts."""
+        paths, classes, tests = self.paths, self.classes, self.tests
+        columns = (self.path_codes, self.class_codes, self.test_codes, self.line_numbers, self.assert_strings)
+        if start or stop is not None:
+            columns = [itertools.islice(column, start, stop) for column in columns]
+        for path_code, class_code, test_code, line_number, assert_string in zip(*columns):
+            yield paths[path_code], classes[class_code], tests[test_code], line_number, assert_string
+
+    def cache_rows(self) -> List[CacheRow]:
+        """Rows without the file path, as stored in the result cache."""
+        classes, tests, categories, methods = self.classes, self.tests, self.categories, self.methods
+        return [
+            (classes[class_code], tests[test_code], line_number, assert_string, categories[category_code],
+             methods[method_code])
+            for class_code, test_code, line_number, assert_string, category_code, method_code in zip(
+                self.class_codes, self.test_codes, self.line_numbers, self.assert_strings, self.category_codes,
+                self.method_codes)
+        ]
+
+    def summarize(self) -> AssertionSummary:
+        """Count assertions per file, class, test, category and directory in one go over the codes."""
+        by_path_code = Counter(self.path_codes)
+        tests_per_file = Counter(path for path, _ in set(zip(self.path_codes, self.test_codes)))
+        empty_class = self._class_index.get('')
+        classes_per_file = Counter(
+            path for path, cls in set(zip(self.path_codes, self.class_codes)) if cls != empty_class
+        )
+        by_class = Counter(self.class_codes)
+        by_class.pop(empty_class, None)
+        by_directory = Counter()
+        for code, count in by_path_code.items():
+            by_directory[self.directories[self.path_directory_codes[code]]] += count
+        return AssertionSummary(
+            total=len(self),
+            by_file=Counter({self.paths[code]: count for code, count in by_path_code.items()}),
+            by_class=Counter({self.classes[code]: count for code, count in by_class.items()}),
+            by_test=Counter({self.tests[code]: count for code, count in Counter(self.test_codes).items()}),
+            by_category=Counter({self.categories[code]: count
+                                 for code, count in Counter(self.category_codes).items()}),
+            by_directory=by_directory,
+            file_tests=Counter({self.paths[code]: count for code, count in tests_per_file.items()}),
+            file_classes=Counter({self.paths[code]: count for code, count in classes_per_file.items()}),
+        )
+
+    def to_dataframe(self, categorical: bool = True):
+        """Build a pandas DataFrame straight from the columns.
+
+        Besides the row columns this includes category, method, directory and basename.
+        With categorical=True the encoded columns become pandas Categoricals that
+        share the table's dictionaries instead of repeating every string.
+        """
+        # pandas is only needed by the GUI, so it is imported on demand
+        import numpy as np
+        import pandas as pd
+
+        def column(codes, values: List[str]):
+            codes = np.asarray(codes, dtype=np.int64)
+            if categorical:
+                return pd.Categorical.from_codes(codes, categories=values)
+            return np.array(values, dtype=object)[codes]
+
+        path_codes = np.asarray(self.path_codes, dtype=np.int64)
+        return pd.DataFrame({
+            'filepath': column(path_codes, self.paths),
+            'testclass': column(self.class_codes, self.classes),
+            'testname': column(self.test_codes, self.tests),
+            'line_number': np.asarray(self.line_numbers, dtype=np.int64),
+            'assert_string': self.assert_strings,
+            'category': column(self.category_codes, self.categories),
+            'method': column(self.method_codes, self.methods),
+            'directory': column(np.asarray(self.path_directory_codes, dtype=np.int64)[path_codes],
+                                self.directories),
+            'basename': column(np.asarray(self.path_basename_codes, dtype=np.int64)[path_codes],
+                               self.basenames),
+        })
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+from records import CacheRow
+
+logger = logging.getLogger(__name__)
+
+# default upper bound for the cache database payload
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# eviction is checked after this many inserts rather than on every one
+EVICT_EVERY = 64
+
+
+def git_blob_sha(data: bytes) -> str:
+    """Compute the git blob SHA-1 of a byte string, as `git hash-object` would."""
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Persistent per-file assertion results keyed by content hash and extractor version.
+
+    Entries live in a SQLite database inside cache_dir. Rows are stored without the
+    file path so that identical content at different paths shares one entry. When the
+    stored payload grows past max_bytes the least recently used entries are evicted.
+
+    Worker processes get a copy of the cache that only reads and inserts entries.
+    The hits and inserts it saw are handed back with take_usage() and applied by
+    the parent with record_usage(), which refreshes last_used and evicts, so the
+    bound holds while a long batch run or server is still going.
+    """
+
+    def __init__(self, cache_dir: str, version: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.RLock()
+        self._puts = 0
+        # content SHAs hit and entries inserted since the last take_usage()
+        self._used: List[str] = []
+        self._stored = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def db_path(self) -> str:
+        return os.path.join(self.cache_dir, "results.sqlite")
+
+    def __getstate__(self):
+        # sqlite connections cannot cross process boundaries; workers reconnect lazily
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        state["_puts"] = 0
+        state["_used"] = []
+        state["_stored"] = 0
+        state["hits"] = 0
+        state["misses"] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # the parent applies usage from several job threads, serialized by _lock
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, rows TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+            self._conn = conn
+        return self._conn
+
+    def _key(self, content_sha: str) -> str:
+        return f"{self.version}:{content_sha}"
+
+    def get(self, content_sha: str) -> Optional[List[CacheRow]]:
+        """Return the cached (testclass, testname, line_number, assert_string, category, method) rows, or None."""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT rows FROM entries WHERE key = ?", (self._key(content_sha),)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache lookup failed: {str(e)}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.append(content_sha)
+        return [tuple(r) for r in json.loads(row[0])]
+
+    def put(self, content_sha: str, rows: List[CacheRow]):
+        """Store the rows extracted from the content identified by content_sha."""
+        payload = json.dumps(rows, separators=(",", ":"))
+        try:
+            with self._lock:
+                self._connect().execute(
+                    "INSERT OR REPLACE INTO entries (key, rows, size, last_used) VALUES (?, ?, ?, ?)",
+                    (self._key(content_sha), payload, len(payload), time.time()),
+                )
+            self._stored += 1
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache store failed: {str(e)}")
+
+    def take_usage(self) -> Tuple[List[str], int]:
+        """Return and reset the content SHAs hit and the number of entries stored since the last call."""
+        used, stored = self._used, self._stored
+        self._used, self._stored = [], 0
+        return used, stored
+
+    def record_usage(self, used: Sequence[str], stored: int):
+        """Apply usage taken from a worker's copy: mark hits as recently used and evict if due."""
+        try:
+            with self._lock:
+                if used:
+                    now = time.time()
+                    conn = self._connect()
+                    conn.execute("BEGIN")
+                    conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                     [(now, self._key(content_sha)) for content_sha in used])
+                    conn.execute("COMMIT")
+                self._puts += stored
+                if self._puts >= EVICT_EVERY:
+                    self.evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache bookkeeping failed: {str(e)}")
+
+    def evict(self):
+        """Drop least recently used entries until the payload fits within max_bytes."""
+        with self._lock:
+            self._puts = 0
+            conn = self._connect()
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # evict down to 90% so we don't end up evicting again on the next insert
+            excess = total - int(self.max_bytes * 0.9)
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used ASC"):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.execute("BEGIN")
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            conn.execute("COMMIT")
+        logger.info(f"Evicted {len(victims)} entries from the result cache")
+
+    def stats(self) -> dict:
+        """Return hit/miss counters plus current entry count and payload size."""
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self.record_usage(*self.take_usage())
+            try:
+                self.evict()
+            except sqlite3.Error as e:
+                logger.warning(f"Result cache eviction failed: {str(e)}")
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+import os
+import csv
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from records import AssertionTable
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repo (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    latest_revision_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS revision (
+    id INTEGER PRIMARY KEY,
+    repo_id INTEGER NOT NULL REFERENCES repo(id) ON DELETE CASCADE,
+    sha TEXT NOT NULL,
+    label TEXT,
+    committed_at INTEGER,
+    extracted_at REAL NOT NULL,
+    extractor_version TEXT NOT NULL,
+    file_count INTEGER NOT NULL,
+    assertion_count INTEGER NOT NULL,
+    UNIQUE (repo_id, sha)
+);
+CREATE TABLE IF NOT EXISTS file (
+    id INTEGER PRIMARY KEY,
+    revision_id INTEGER NOT NULL REFERENCES revision(id) ON DELETE CASCADE,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS class (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES file(id) ON DELETE CASCADE,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS test (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES file(id) ON DELETE CASCADE,
+    class_id INTEGER REFERENCES class(id) ON DELETE CASCADE,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assertion (
+    id INTEGER PRIMARY KEY,
+    test_id INTEGER NOT NULL REFERENCES test(id) ON DELETE CASCADE,
+    line_number INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    category TEXT NOT NULL,
+    assert_string TEXT NOT NULL
+);
+-- per-revision rollup so cross-repo and historical questions never touch assertion rows
+CREATE TABLE IF NOT EXISTS method_count (
+    revision_id INTEGER NOT NULL REFERENCES revision(id) ON DELETE CASCADE,
+    method TEXT NOT NULL,
+    category TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (revision_id, method, category)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS revision_repo ON revision(repo_id, committed_at);
+CREATE INDEX IF NOT EXISTS file_revision ON file(revision_id, path);
+CREATE INDEX IF NOT EXISTS class_file ON class(file_id);
+CREATE INDEX IF NOT EXISTS class_name ON class(name);
+CREATE INDEX IF NOT EXISTS test_file ON test(file_id);
+CREATE INDEX IF NOT EXISTS test_class ON test(class_id);
+CREATE INDEX IF NOT EXISTS assertion_test ON assertion(test_id);
+CREATE INDEX IF NOT EXISTS assertion_method ON assertion(method);
+CREATE INDEX IF NOT EXISTS method_count_method ON method_count(method, revision_id);
+CREATE INDEX IF NOT EXISTS method_count_category ON method_count(category, revision_id);
+"""
+
+class ResultStore:
+    """SQLite database of extraction results across repositories and revisions.
+
+    Each (repo, revision) is stored once: saving it again replaces the previous
+    rows in a single transaction. Paths, classes and tests are normalized into
+    their own tables, and per-revision counts by assertion method and category
+    are kept in method_count so aggregate queries are index lookups. The store
+    may be shared by threads; writes are serialized.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"{db_path} has schema version {version}, expected {SCHEMA_VERSION}")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _next_id(self, table: str) -> int:
+        return self._conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+
+    def save(self, url: str, sha: str, assertions: AssertionTable, extractor_version: str,
+             label: Optional[str] = None, committed_at: Optional[int] = None,
+             root: Optional[str] = None, file_count: Optional[int] = None) -> int:
+        """Store the assertions of url at commit sha, replacing any earlier copy; returns the revision id.
+
+        Paths under root (e.g. a temporary checkout) are stored relative to it.
+        file_count is the number of test files analyzed, defaulting to the files
+        that contain assertions.
+        """
+        def relative(path: str) -> str:
+            if root and os.path.isabs(path):
+                return os.path.relpath(path, root).replace(os.sep, '/')
+            return path
+
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT INTO repo (url) VALUES (?) ON CONFLICT (url) DO NOTHING", (url,))
+                repo_id = conn.execute("SELECT id FROM repo WHERE url = ?", (url,)).fetchone()[0]
+                # replacing a revision drops its files, classes, tests, assertions and rollup by cascade
+                conn.execute("DELETE FROM revision WHERE repo_id = ? AND sha = ?", (repo_id, sha))
+                cursor = conn.execute(
+                    "INSERT INTO revision (repo_id, sha, label, committed_at, extracted_at, extractor_version, "
+                    "file_count, assertion_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (repo_id, sha, label, committed_at, time.time(), extractor_version,
+                     len(assertions.paths) if file_count is None else file_count, len(assertions)),
+                )
+                revision_id = cursor.lastrowid
+
+                # ids are assigned here so every table can be filled with one executemany;
+                # the IMMEDIATE transaction keeps other writers out meanwhile
+                file_base = self._next_id('file')
+                conn.executemany(
+                    "INSERT INTO file (id, revision_id, path) VALUES (?, ?, ?)",
+                    ((file_base + code, revision_id, relative(path)) for code, path in enumerate(assertions.paths)),
+                )
+                class_ids: Dict[Tuple[int, int], int] = {}
+                test_ids: Dict[Tuple[int, int, int], int] = {}
+                for path_code, class_code, test_code in zip(
+                        assertions.path_codes, assertions.class_codes, assertions.test_codes):
+                    if assertions.classes[class_code] and (path_code, class_code) not in class_ids:
+                        class_ids[(path_code, class_code)] = len(class_ids)
+                    if (path_code, class_code, test_code) not in test_ids:
+                        test_ids[(path_code, class_code, test_code)] = len(test_ids)
+                class_base = self._next_id('class')
+                conn.executemany(
+                    "INSERT INTO class (id, file_id, name) VALUES (?, ?, ?)",
+                    ((class_base + index, file_base + path_code, assertions.classes[class_code])
+                     for (path_code, class_code), index in class_ids.items()),
+                )
+                test_base = self._next_id('test')
+                conn.executemany(
+                    "INSERT INTO test (id, file_id, class_id, name) VALUES (?, ?, ?, ?)",
+                    ((test_base + index, file_base + path_code,
+                      class_base + class_ids[(path_code, class_code)] if (path_code, class_code) in class_ids else None,
+                      assertions.tests[test_code])
+                     for (path_code, class_code, test_code), index in test_ids.items()),
+                )
+                categories, methods = assertions.categories, assertions.methods
+                conn.executemany(
+                    "INSERT INTO assertion (test_id, line_number, method, category, assert_string) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    ((test_base + test_ids[(path_code, class_code, test_code)], line_number, methods[method_code],
+                      categories[category_code], assert_string)
+                     for path_code, class_code, test_code, line_number, category_code, method_code, assert_string
+                     in zip(assertions.path_codes, assertions.class_codes, assertions.test_codes,
+                            assertions.line_numbers, assertions.category_codes, assertions.method_codes,
+                            assertions.assert_strings)),
+                )
+                rollup = Counter(zip(assertions.method_codes, assertions.category_codes))
+                conn.executemany(
+                    "INSERT INTO method_count (revision_id, method, category, count) VALUES (?, ?, ?, ?)",
+                    ((revision_id, methods[method_code], categories[category_code], count)
+                     for (method_code, category_code), count in rollup.items()),
+                )
+                # the latest revision is the newest commit, falling back to the newest extraction
+                conn.execute(
+                    "UPDATE repo SET latest_revision_id = (SELECT id FROM revision WHERE repo_id = ? "
+                    "ORDER BY committed_at IS NULL, committed_at DESC, extracted_at DESC LIMIT 1) WHERE id = ?",
+                    (repo_id, repo_id),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Stored {len(assertions)} assertions for {url} at {sha[:12]} in {self.db_path}")
+        return revision_id
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def load(self, url: str, sha: str) -> AssertionTable:
+        """Read the stored assertions of url at sha back into a table, in extraction order."""
+        table = AssertionTable()
+        for row in self._query(
+                "SELECT f.path, COALESCE(c.name, ''), t.name, a.line_number, a.assert_string, a.category, a.method "
+                "FROM repo r JOIN revision v ON v.repo_id = r.id JOIN file f ON f.revision_id = v.id "
+                "JOIN test t ON t.file_id = f.id LEFT JOIN class c ON c.id = t.class_id "
+                "JOIN assertion a ON a.test_id = t.id WHERE r.url = ? AND v.sha = ? ORDER BY a.id",
+                (url, sha)):
+            table.append(*row)
+        return table
+
+    def repos(self) -> List[Tuple]:
+        """(url, stored revisions, sha, files and assertions of the latest revision) per repository."""
+        return self._query(
+            "SELECT r.url, (SELECT COUNT(*) FROM revision WHERE repo_id = r.id), v.sha, v.file_count, "
+            "v.assertion_count FROM repo r LEFT JOIN revision v ON v.id = r.latest_revision_id ORDER BY r.url"
+        )
+
+    def history(self, url: str) -> List[Tuple]:
+        """(sha, label, committed_at, extracted_at, files, assertions) of every stored revision, oldest first."""
+        return self._query(
+            "SELECT v.sha, v.label, v.committed_at, v.extracted_at, v.file_count, v.assertion_count "
+            "FROM revision v JOIN repo r ON r.id = v.repo_id WHERE r.url = ? "
+            "ORDER BY v.committed_at IS NULL, v.committed_at, v.extracted_at",
+            (url,),
+        )
+
+    def top_repos(self, method: Optional[str] = None, category: Optional[str] = None,
+                  limit: int = 20) -> List[Tuple]:
+        """Repositories ranked by uses of an assertion method or category in their latest revision."""
+        column, value = ('method', method) if method else ('category', category)
+        return self._query(
+            f"SELECT r.url, v.sha, SUM(m.count) AS uses, v.assertion_count FROM repo r "
+            f"JOIN revision v ON v.id = r.latest_revision_id "
+            f"JOIN method_count m ON m.revision_id = v.id AND m.{column} = ? "
+            f"GROUP BY r.id ORDER BY uses DESC LIMIT ?",
+            (value, limit),
+        )
+
+    def breakdown(self, by: str = 'method', url: Optional[str] = None, limit: int = 20) -> List[Tuple]:
+        """Assertion counts per method or category over the latest revision of one or every repository."""
+        column = 'method' if by == 'method' else 'category'
+        where, params = ("WHERE r.url = ?", [url]) if url else ("", [])
+        return self._query(
+            f"SELECT m.{column}, SUM(m.count) AS uses FROM repo r "
+            f"JOIN method_count m ON m.revision_id = r.latest_revision_id {where} "
+            f"GROUP BY m.{column} ORDER BY uses DESC LIMIT ?",
+            params + [limit],
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query a database of stored extraction results")
+    parser.add_argument("db", help="SQLite result store written with --store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("repos", help="stored repositories and their latest revision")
+    history = commands.add_parser("history", help="assertion counts of every stored revision of a repository")
+    history.add_argument("url")
+    top = commands.add_parser("top-repos", help="repositories using an assertion method or category the most")
+    group = top.add_mutually_exclusive_group(required=True)
+    group.add_argument("--method", help="e.g. assertRaises, assert, pytest.raises")
+    group.add_argument("--category", help="e.g. Exception, Equality")
+    top.add_argument("--limit", type=int, default=20)
+    breakdown = commands.add_parser("breakdown", help="assertion counts per method or category")
+    breakdown.add_argument("--by", choices=("method", "category"), default="method")
+    breakdown.add_argument("--repo", default=None, help="only this repository (default: all)")
+    breakdown.add_argument("--limit", type=int, default=20)
+    export = commands.add_parser("export", help="write the stored rows of one revision as CSV")
+    export.add_argument("url")
+    export.add_argument("sha")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.db):
+        logger.error(f"No result store at {args.db}")
+        sys.exit(1)
+    writer = csv.writer(sys.stdout)
+    with ResultStore(args.db) as store:
+        if args.command == "repos":
+            writer.writerow(['url', 'revisions', 'latest_sha', 'files', 'assertions'])
+            writer.writerows(store.repos())
+        elif args.command == "history":
+            writer.writerow(['sha', 'label', 'committed_at', 'extracted_at', 'files', 'assertions'])
+            writer.writerows(store.history(args.url))
+        elif args.command == "top-repos":
+            writer.writerow(['url', 'sha', 'uses', 'assertions'])
+            writer.writerows(store.top_repos(args.method, args.category, args.limit))
+        elif args.command == "breakdown":
+            writer.writerow([args.by, 'uses'])
+            writer.writerows(store.breakdown(args.by, args.repo, args.limit))
+        elif args.command == "export":
+            # imported here so the query commands stay light
+            from assertion_extractor import CSV_HEADER
+            table = store.load(args.url, args.sha)
+            if not table:
+                logger.error(f"Nothing stored for {args.url} at {args.sha}")
+                sys.exit(1)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(table.iter_tuples())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+import os
+import io
+import csv
+import json
+import logging
+import argparse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import git
+
+from assertion_extractor import CSV_HEADER, ROW_KEYS, EXTRACTOR_VERSION, DEFAULT_MAX_FILE_MB
+from clone_manager import CloneError, ls_remote
+from guarded_pool import GuardedPool
+from jobs import ExtractionJob, JobCache, JobQueueFull
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+# how often a streaming response checks a running job for new rows
+STREAM_POLL_INTERVAL = 0.2
+# upper bound for ?wait= on the status endpoint, in seconds
+MAX_WAIT = 60.0
+
+
+def start_pool(workers: int, time_budget: Optional[float] = None) -> GuardedPool:
+    """Start the analysis workers before the first job.
+
+    A GuardedPool replaces a worker that dies (e.g. killed for memory) instead
+    of breaking the pool for every later job, and with a time_budget it also
+    kills workers stuck on a file.
+    """
+    pool = GuardedPool(workers, time_budget)
+    budget = f" with a {time_budget}s budget per file" if time_budget else ""
+    logger.info(f"Started {workers} analysis workers{budget}")
+    return pool
+
+
+def resolve_commit(url_or_path: str, rev: Optional[str] = None) -> Tuple[str, str]:
+    """Return the normalized repository location and the commit SHA rev points to.
+
+    Local repositories are resolved in place, so any revision expression works;
+    remote ones are asked with ls-remote and accept branch names, tags or full SHAs.
+    """
+    if os.path.isdir(url_or_path):
+        path = os.path.abspath(url_or_path)
+        try:
+            repo = git.Repo(path)
+            try:
+                return path, repo.git.rev_parse(f"{rev or 'HEAD'}^{{commit}}")
+            finally:
+                repo.close()
+        except git.InvalidGitRepositoryError as e:
+            raise CloneError(f"{url_or_path} is not a git repository") from e
+        except git.GitCommandError as e:
+            raise CloneError(f"Unknown revision {rev} in {url_or_path}: {e.stderr.strip()}") from e
+    return url_or_path, ls_remote(url_or_path, rev)
+
+
+def job_status(job: ExtractionJob) -> Dict:
+    return {
+        'id': job.id,
+        'url': job.url,
+        'sha': job.sha,
+        'state': job.state,
+        'progress': round(job.progress(), 3),
+        'files_done': job.files_done,
+        'files_total': job.files_total,
+        'assertions': len(job.assertions),
+        'skipped': len(job.assertions.skipped),
+        'error': job.error,
+        'submitted': job.submitted,
+        'finished': job.finished,
+        'results': f"/jobs/{job.id}/results",
+        'summary': f"/jobs/{job.id}/summary",
+    }
+
+
+class ExtractionServer(ThreadingHTTPServer):
+    """HTTP server whose handlers share one JobCache."""
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], jobs: JobCache):
+        super().__init__(address, ExtractionHandler)
+        self.jobs = jobs
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    """JSON API for submitting extraction jobs and polling or streaming their results.
+
+    POST /jobs                    {"url": ..., "rev": ..., "profile": false} -> job status
+    GET  /jobs                    status of every job held by the server
+    GET  /jobs/<id>?wait=SECONDS  job status, optionally waiting for the job to finish
+    GET  /jobs/<id>/results       rows as JSON Lines (or ?format=csv), streamed until the
+                                  job finishes; ?follow=0 returns only the rows so far
+    GET  /jobs/<id>/summary       per-file, class, test, category and directory counts,
+                                  plus the files that were skipped and why
+    GET  /health
+    """
+    server_version = 'assertain'
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status: HTTPStatus, payload, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str):
+        self._send_json(status, {'error': message})
+
+    def _route(self) -> Tuple[List[str], Dict[str, List[str]]]:
+        parsed = urlparse(self.path)
+        return [part for part in parsed.path.split('/') if part], parse_qs(parsed.query)
+
+    def do_GET(self):
+        parts, query = self._route()
+        jobs = self.server.jobs
+        if parts == ['health']:
+            self._send_json(HTTPStatus.OK, {'status': 'ok', 'extractor_version': EXTRACTOR_VERSION})
+            return
+        if parts == ['jobs']:
+            self._send_json(HTTPStatus.OK, [job_status(job) for job in jobs.jobs()])
+            return
+        if len(parts) < 2 or parts[0] != 'jobs' or len(parts) > 3:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path {self.path}")
+            return
+        job = jobs.find(parts[1])
+        if job is None:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown job {parts[1]}")
+            return
+
+        if len(parts) == 2:
+            try:
+                wait = min(float(query.get('wait', ['0'])[0]), MAX_WAIT)
+            except ValueError:
+                self._send_error(HTTPStatus.BAD_REQUEST, "wait must be a number of seconds")
+                return
+            if wait > 0:
+                job.wait(wait)
+            self._send_json(HTTPStatus.OK, job_status(job))
+        elif parts[2] == 'results':
+            output_format = query.get('format', ['jsonl'])[0]
+            if output_format not in ('jsonl', 'csv'):
+                self._send_error(HTTPStatus.BAD_REQUEST, f"Unsupported format {output_format}")
+                return
+            follow = query.get('follow', ['1'])[0] not in ('0', 'false')
+            try:
+                self._stream_results(job, output_format, follow)
+            except (BrokenPipeError, ConnectionResetError):
+                logger.info(f"Client went away while streaming {job.id}")
+        elif parts[2] == 'summary':
+            if job.summary is None:
+                self._send_error(HTTPStatus.CONFLICT, f"Job {job.id} is {job.state}")
+                return
+            self._send_json(HTTPStatus.OK, dict(job.summary._asdict(), id=job.id,
+                                                skipped=[entry._asdict() for entry in job.assertions.skipped]))
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path {self.path}")
+
+    def _stream_results(self, job: ExtractionJob, output_format: str, follow: bool):
+        # HTTP/1.0 without a Content-Length: the body ends when the connection closes
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/csv' if output_format == 'csv' else 'application/x-ndjson')
+        self.send_header('X-Job-Id', job.id)
+        self.end_headers()
+        if output_format == 'csv':
+            self.wfile.write((','.join(CSV_HEADER) + '\r\n').encode('utf-8'))
+        sent = 0
+        while True:
+            finished = job.done()
+            available = len(job.assertions)
+            if available > sent:
+                buffer = io.StringIO()
+                if output_format == 'csv':
+                    csv.writer(buffer).writerows(job.assertions.iter_tuples(sent, available))
+                else:
+                    for row in job.assertions.iter_tuples(sent, available):
+                        buffer.write(json.dumps(dict(zip(ROW_KEYS, row)), ensure_ascii=False))
+                        buffer.write('\n')
+                self.wfile.write(buffer.getvalue().encode('utf-8'))
+                self.wfile.flush()
+                sent = available
+            if finished or not follow:
+                return
+            job.wait(STREAM_POLL_INTERVAL)
+
+    def do_POST(self):
+        parts, _ = self._route()
+        if parts != ['jobs']:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path {self.path}")
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            url = request['url']
+        except (ValueError, KeyError, TypeError):
+            self._send_error(HTTPStatus.BAD_REQUEST, 'expected a JSON object with a "url" field')
+            return
+        try:
+            url, sha = resolve_commit(url, request.get('rev'))
+            job = self.server.jobs.submit(url, sha, profile=bool(request.get('profile')))
+        except (CloneError, git.UnsafeOptionError, git.UnsafeProtocolError) as e:
+            # the unsafe errors come from URLs like --upload-pack=... that git would read as options
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        except JobQueueFull as e:
+            self._send_error(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+            return
+        status = HTTPStatus.OK if job.done() else HTTPStatus.ACCEPTED
+        self._send_json(status, job_status(job), {'Location': f"/jobs/{job.id}"})
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve assertion extraction jobs over HTTP on localhost")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="analysis worker processes (default: CPU count)")
+    parser.add_argument("--max-running", type=int, default=2, help="jobs cloned and analyzed at the same time")
+    parser.add_argument("--max-queued", type=int, default=32,
+                        help="unfinished jobs accepted before new submissions are refused")
+    parser.add_argument("--max-entries", type=int, default=16, help="finished jobs kept in memory")
+    parser.add_argument("--cache-dir", default=None, help="directory of the per-file result cache")
+    parser.add_argument("--clone-cache", default=None, metavar="DIR", help="directory of cached mirrors")
+    parser.add_argument("--max-file-size", type=float, default=DEFAULT_MAX_FILE_MB, metavar="MB",
+                        help="skip test files larger than this (0 = no limit)")
+    parser.add_argument("--time-budget", type=float, default=None, metavar="SECONDS",
+                        help="kill and skip the analysis of any file taking longer than this")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    cache = ResultCache(args.cache_dir, EXTRACTOR_VERSION) if args.cache_dir else None
+    # the pool is forked before any server thread exists
+    pool = start_pool(args.workers or os.cpu_count() or 1, args.time_budget)
+    jobs = JobCache(max_entries=args.max_entries, max_running=args.max_running, max_queued=args.max_queued,
+                    executor=pool, clone_cache=args.clone_cache, cache=cache,
+                    max_bytes=int(args.max_file_size * 1024 * 1024) if args.max_file_size > 0 else None)
+    server = ExtractionServer((args.host, args.port), jobs)
+    logger.info(f"Listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        jobs.shutdown()
+        pool.shutdown(cancel_futures=True)
+        if cache is not None:
+            cache.close()
+
+
+if __name__ == "__main__":
+    main()